@@ -1,14 +1,14 @@
 import os
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QInputDialog,
-                             QMessageBox, QVBoxLayout,
-                             QFileDialog, QGraphicsScene, QGraphicsView)
-from PyQt6.QtCore import Qt, QPointF, QObject
-from PyQt6.QtGui import QColor, QPainter, QBrush
+                             QMessageBox,
+                             QFileDialog, QGraphicsScene)
+from PyQt6.QtCore import Qt, QPointF
+from PyQt6.QtGui import QColor, QBrush
 
 from ui.editor_ui import EditorWindowUI
 from graphical import (Controller, BlockFrame, PortItem, InstanceItem,
                        WireItem,
-                       JunctionItem)
+                       JunctionItem, EditorScene, snap_to_rect_edge)
 from netlist_model import NetlistProject
 from version_manager import VersionManager
 from parser.parser import Parser
@@ -27,27 +27,16 @@ class Editor(QMainWindow):
         self.ui.show()
 
         # Initialize graphical components
-        self.scene = QGraphicsScene()
+        self.scene = EditorScene()
         self.scene.setBackgroundBrush(QBrush(QColor("#000000")))
 
-        self.view = QGraphicsView(self.scene)
-        try:
-            self.view.setRenderHints(QPainter.RenderHint.Antialiasing)
-        except Exception:
-            pass
+        self.view = self.ui.graphics_view
+        self.view.setScene(self.scene)
 
         self.controller = Controller(self.scene)
 
-        # Add the graphics view to the UI layout
-        graphics_widget = self.ui.graphics_frame
-        layout = graphics_widget.layout()
-        if layout is None:
-            layout = QVBoxLayout(graphics_widget)
-        layout.addWidget(self.view)
-
         # Mode management
         self.active_mode = None
-        self.current_filter = None
         self._current_block_id = None
 
         # Initialize version manager (None means unsaved file - will create UUID repository)
@@ -196,6 +185,8 @@ class Editor(QMainWindow):
                 return
 
             try:
+                # Commit edits still waiting in the old manager's coalescing window
+                self.version_manager.flush()
                 # Create new version manager for this file (will load existing repository if available)
                 self.version_manager = VersionManager(file_path,
                                                       self.controller)
@@ -310,11 +301,8 @@ class Editor(QMainWindow):
         if idx < 0 or idx >= self.ui.objects_list.count():
             return None
         item = self.ui.objects_list.item(idx)
-        block_name = item.text()
-        for block_id, block_frame in self.controller.blocks.items():
-            if block_frame.model.name == block_name:
-                return block_id
-        return None
+        block_frame = self.controller.blocks_by_name.get(item.text())
+        return block_frame.model.id if block_frame else None
 
     def _show_block_by_index(self, idx: int):
         """Show block by index."""
@@ -324,21 +312,28 @@ class Editor(QMainWindow):
         self.controller.show_only_block(bid)
         self._current_block_id = bid
 
+    def _set_mode(self, mode, handler=None):
+        """Route scene clicks to handler while mode is active."""
+        if handler is not None:
+            self.scene.set_mode_handler(mode, handler)
+        # wire edits move many small items, BSP rebuilds would dominate
+        if mode in ('wire', 'junction'):
+            index = QGraphicsScene.ItemIndexMethod.NoIndex
+        else:
+            index = QGraphicsScene.ItemIndexMethod.BspTreeIndex
+        if self.scene.itemIndexMethod() != index:
+            self.scene.setItemIndexMethod(index)
+        self.active_mode = mode
+        self.scene.set_mode(mode)
+
     def _deactivate_mode(self):
         """Deactivate current mode."""
-        if self.current_filter:
-            try:
-                self.view.viewport().removeEventFilter(self.current_filter)
-            except Exception:
-                pass
-            self.current_filter = None
-
         if self.active_mode == 'wire':
             self.controller.set_add_wire_mode(False)
         elif self.active_mode == 'junction':
             self.controller.set_add_junction_mode(False)
 
-        self.active_mode = None
+        self._set_mode(None)
 
     def refresh_objects_list(self):
         """Refresh the list of objects (blocks) in the objects_list widget."""
@@ -358,12 +353,10 @@ class Editor(QMainWindow):
 
     def on_object_selected(self, item):
         """Handle selection of an object in the objects list."""
-        block_name = item.text()
-        for block_id, block_frame in self.controller.blocks.items():
-            if block_frame.model.name == block_name:
-                self.controller.show_only_block(block_id)
-                self._current_block_id = block_id
-                break
+        block_frame = self.controller.blocks_by_name.get(item.text())
+        if block_frame:
+            self.controller.show_only_block(block_frame.model.id)
+            self._current_block_id = block_frame.model.id
 
     def add_block(self):
         """Add a new block to both graphical and object model."""
@@ -440,8 +433,7 @@ class Editor(QMainWindow):
         try:
             # Use controller's copy method which uses model.copy() for deep copy with new IDs
             new_bf = self.controller.copy_block(block)
-            new_bf.model.name = new_name
-            new_bf.title.setText(new_name)
+            self.controller.rename_block(new_bf, new_name)
 
             if not self._sync_block_added(new_name):
                 self.controller.delete_block(new_bf)
@@ -488,8 +480,7 @@ class Editor(QMainWindow):
                 old_name = block.model.name
                 if not self._sync_block_renamed(old_name, new_name):
                     return
-                block.model.name = new_name
-                block.title.setText(new_name)
+                self.controller.rename_block(block, new_name)
                 self.refresh_objects_list()
                 self._save_version(
                     f"Rename block '{old_name}' to '{new_name}'")
@@ -516,43 +507,34 @@ class Editor(QMainWindow):
             QMessageBox.warning(self, "Error",
                                 "Cannot insert block into itself.")
             return
-        child_frame = next(bf for bf in self.controller.blocks.values() if
-                           bf.model.name == child_name)
-        parent_frame = next(bf for bf in self.controller.blocks.values() if
-                            bf.model.name == parent_name)
+        child_frame = self.controller.blocks_by_name[child_name]
+        parent_frame = self.controller.blocks_by_name[parent_name]
 
         def handler(ev):
-            pos = self.view.mapToScene(ev.position().toPoint())
-            if parent_frame.mapRectToScene(parent_frame.rect()).contains(pos):
+            pos = ev.scenePos()
+            if parent_frame in self.scene.items(pos):
                 local = parent_frame.mapFromScene(pos)
                 try:
                     inst_item = parent_frame.add_instance(child_frame, local)
                 except Exception as e:
                     QMessageBox.warning(self, "Error",
                                         f"Failed to add instance: {e}")
-                    self.view.viewport().removeEventFilter(filter_obj)
+                    self._deactivate_mode()
                     return True
                 if not self._sync_instance_added(parent_name,
                                                  inst_item.model.name,
                                                  child_frame.model.name):
                     self.controller.delete_instance(inst_item)
-                    self.view.viewport().removeEventFilter(filter_obj)
+                    self._deactivate_mode()
                     return True
                 self._save_version(
                     f"Add instance '{inst_item.model.name}' to '{parent_name}'")
                 self.refresh_objects_list()
-                self.view.viewport().removeEventFilter(filter_obj)
+                self._deactivate_mode()
                 return True
             return False
 
-        class OneShot(QObject):
-            def eventFilter(self, obj, ev):
-                if ev.type() == 2:
-                    return handler(ev)
-                return False
-
-        filter_obj = OneShot()
-        self.view.viewport().installEventFilter(filter_obj)
+        self._set_mode('instance', handler)
 
     def delete_instance(self):
         """Delete the selected instance."""
@@ -666,46 +648,25 @@ class Editor(QMainWindow):
         self._deactivate_mode()
 
         def handler(ev):
-            pos = self.view.mapToScene(ev.position().toPoint())
-            for bf in self.controller.blocks.values():
-                if bf.isVisible() and bf.mapRectToScene(bf.rect()).contains(
-                        pos):
+            pos = ev.scenePos()
+            for bf in self.scene.items(pos):
+                if isinstance(bf, BlockFrame):
                     self._controller_add_block_pin_at_point(bf, pos)
-                    self.view.viewport().removeEventFilter(filter_obj)
+                    self._deactivate_mode()
                     return True
             return False
 
-        class OneShot(QObject):
-            def eventFilter(self, obj, ev):
-                if ev.type() == 2:
-                    return handler(ev)
-                return False
-
-        filter_obj = OneShot()
-        self.view.viewport().installEventFilter(filter_obj)
+        self._set_mode('pin', handler)
 
     def _controller_add_block_pin_at_point(self, block_frame: BlockFrame,
                                            scene_pos: QPointF):
         """Add block pin at specific point."""
         local = block_frame.mapFromScene(scene_pos)
         rect = block_frame.rect()
-        lx = min(max(local.x(), 0.0), rect.width())
-        ly = min(max(local.y(), 0.0), rect.height())
-        left = lx
-        right = rect.width() - lx
-        top = ly
-        bottom = rect.height() - ly
-        m = min(left, right, top, bottom)
-        if m == left:
-            nx, ny = 0.0, ly
-        elif m == right:
-            nx, ny = rect.width(), ly
-        elif m == top:
-            nx, ny = lx, 0.0
-        else:
-            nx, ny = lx, rect.height()
-        relx = nx / rect.width() if rect.width() else 0.0
-        rely = ny / rect.height() if rect.height() else 0.0
+        w, h = rect.width(), rect.height()
+        nx, ny = snap_to_rect_edge(local.x(), local.y(), w, h)
+        relx = nx / w if w else 0.0
+        rely = ny / h if h else 0.0
         pm = block_frame.add_block_pin(name=None, relx=relx, rely=rely)
         block_name = block_frame.model.name
         if not self._sync_pin_added(block_name, pm.name):
@@ -791,7 +752,7 @@ class Editor(QMainWindow):
         if not self._sync_pin_renamed(block_name, old_name, new_name):
             return
 
-        pin.model.name = new_name
+        block_frame.model.rename_port(pin.model, new_name)
         pin.label.setText(new_name)
 
         for instance in self.controller.get_instances(block_name):
@@ -808,22 +769,14 @@ class Editor(QMainWindow):
             return
 
         self._deactivate_mode()
-        self.active_mode = 'wire'
         self.controller.set_add_wire_mode(True)
 
         def handler(ev):
             if ev.button() != Qt.MouseButton.LeftButton:
                 return False
 
-            pos = self.view.mapToScene(ev.position().toPoint())
-            items = self.scene.items(pos)
-
-            item = None
-            for it in items:
-                if isinstance(it, (PortItem, JunctionItem)):
-                    item = it
-                    break
-
+            pos = ev.scenePos()
+            item = self.scene.item_of_type_at(pos, (PortItem, JunctionItem))
             if item is None:
                 return False
 
@@ -863,24 +816,10 @@ class Editor(QMainWindow):
                                        None) or self._generate_net_name(
                         block_frame)
 
-                    def get_type_and_id_and_name(connection):
-                        # lambda connection: (*(lambda x: ('inst' if ':' not in x else x.split(':')[0], x[0] if ':' not in x else x.split(':')[1]))(connection[0]), connection[1])
-                        _type = None
-                        _id = None
-                        if ':' not in connection[0]:
-                            _type = 'inst'
-                            _id = connection[0]
-                        else:
-                            splitted = connection[0].split(':')
-                            _type = splitted[0]
-                            _id = splitted[1]
-                        name = connection[1]
-                        return _type, _id, name
-
-                    start_type, start_id, start_name = get_type_and_id_and_name(
-                        wire_model.start)
-                    end_type, end_id, end_name = get_type_and_id_and_name(
-                        wire_model.end)
+                    start_type, start_id, start_name = \
+                        self._split_connection(wire_model.start)
+                    end_type, end_id, end_name = \
+                        self._split_connection(wire_model.end)
 
                     functions = {
                         'inst': self.controller.get_instance_by_id,
@@ -1011,14 +950,16 @@ class Editor(QMainWindow):
                 self._deactivate_mode()
                 return True
 
-        class WireModeFilter(QObject):
-            def eventFilter(self, obj, ev):
-                if ev.type() == 2:
-                    return handler(ev)
-                return False
+        self._set_mode('wire', handler)
 
-        self.current_filter = WireModeFilter()
-        self.view.viewport().installEventFilter(self.current_filter)
+    @staticmethod
+    def _split_connection(connection):
+        """Split a wire endpoint into (type, id, pin name)."""
+        key, name = connection[0], connection[1]
+        if ':' not in key:
+            return 'inst', key, name
+        _type, _id = key.split(':', 1)
+        return _type, _id, name
 
     def _is_pin_already_connected(self, port_item: PortItem,
                                   block_frame: BlockFrame) -> bool:
@@ -1182,6 +1123,7 @@ class Editor(QMainWindow):
                 visited_junctions.add(junction_id)
 
                 # Найти все wires, подключенные к этому junction
+                jkey = "j:" + junction_id
                 for wm in block_frame.model.wires:
                     if wm.id in visited_wires:
                         continue
@@ -1190,10 +1132,10 @@ class Editor(QMainWindow):
                     # - его start или end ссылаются на junction
                     is_connected = False
                     if wm.start and len(wm.start) > 0 and wm.start[
-                        0] == f"j:{junction_id}":
+                        0] == jkey:
                         is_connected = True
                     if wm.end and len(wm.end) > 0 and wm.end[
-                        0] == f"j:{junction_id}":
+                        0] == jkey:
                         is_connected = True
 
                     if is_connected:
@@ -1215,25 +1157,21 @@ class Editor(QMainWindow):
             return
 
         self._deactivate_mode()
-        self.active_mode = 'junction'
         self.controller.set_add_junction_mode(True)
 
         def handler(ev):
             if ev.button() != Qt.MouseButton.LeftButton:
                 return False
 
-            pos = self.view.mapToScene(ev.position().toPoint())
-            items = self.scene.items(pos)
-
-            for it in items:
+            pos = ev.scenePos()
+            wire_item = None
+            for it in self.scene.items(pos):
                 if isinstance(it, JunctionItem):
                     return False
-
-            wire_item = None
-            for it in items:
-                if isinstance(it, WireItem):
+                if wire_item is None and isinstance(it, WireItem):
                     wire_item = it
-                    break
+            if wire_item is None:
+                wire_item = self.controller.nearest_wire_at(pos)
 
             if wire_item is not None:
                 self.controller.create_junction_at(pos, wire_item)
@@ -1243,18 +1181,7 @@ class Editor(QMainWindow):
 
             return False
 
-        class JunctionModeFilter(QObject):
-            def eventFilter(self, obj, ev):
-                if ev.type() == 2:
-                    result = handler(ev)
-                    if result:
-                        ev.accept()
-                        return True
-                    return False
-                return False
-
-        self.current_filter = JunctionModeFilter()
-        self.view.viewport().installEventFilter(self.current_filter)
+        self._set_mode('junction', handler)
 
     def delete_junction(self):
         """Delete the selected junction."""
@@ -1289,12 +1216,10 @@ class Editor(QMainWindow):
 
     def _block_name_exists(self, name: str, exclude_id: str = None) -> bool:
         """Check if a block name already exists."""
-        for block_id, block_frame in self.controller.blocks.items():
-            if exclude_id and block_id == exclude_id:
-                continue
-            if block_frame.model.name == name:
-                return True
-        return False
+        block_frame = self.controller.blocks_by_name.get(name)
+        if block_frame is None:
+            return False
+        return not (exclude_id and block_frame.model.id == exclude_id)
 
     def _instance_name_exists_in_block(self, block_frame: BlockFrame,
                                        name: str,
@@ -1,6 +1,8 @@
+import os
 import sys
 import json
 import uuid
+from contextlib import contextmanager
 from dataclasses import dataclass, field, asdict
 from typing import List, Dict, Optional, Tuple, Any
 
@@ -10,8 +12,8 @@ from PyQt6.QtWidgets import (
     QGraphicsItem, QGraphicsRectItem, QGraphicsEllipseItem, QGraphicsPathItem,
     QGraphicsSimpleTextItem, QInputDialog, QMessageBox, QPushButton, QComboBox
 )
-from PyQt6.QtGui import QPen, QBrush, QColor, QPainterPath, QPainter
-from PyQt6.QtCore import Qt, QPointF, QObject, QRectF
+from PyQt6.QtGui import QPen, QBrush, QColor, QPainterPath, QPainter, QTransform
+from PyQt6.QtCore import Qt, QPointF, QRectF, QSignalBlocker, QTimer, pyqtSlot
 
 try:
     from PyQt6.QtGui import QPainterPathStroker
@@ -20,17 +22,123 @@ try:
 except Exception:
     STROKER_AVAILABLE = False
 
+# shared, read-only pens and brushes for scene items
+_OUTLINE_PEN = QPen(Qt.GlobalColor.black, 1)
+_TEXT_BRUSH = QBrush(Qt.GlobalColor.white)
+_BLOCK_PIN_BRUSH = QBrush(QColor("lime"))
+_INSTANCE_PIN_BRUSH = QBrush(QColor("orange"))
+_ACTIVE_PIN_BRUSH = QBrush(QColor("red"))
+_JUNCTION_BRUSH = QBrush(QColor("#FF69B4"))
+_INSTANCE_PEN = QPen(QColor("white"), 2)
+_INSTANCE_BRUSH = QBrush(QColor("#2E86C1"))
+_WIRE_PEN = QPen(QColor("#FFD700"), 2)
+_WIRE_HOVER_PEN = QPen(QColor("#FFA500"), 3)
+_BLOCK_PEN = QPen(QColor("#888888"), 2)
+_BLOCK_BRUSH = QBrush(QColor("#0b0b0b"))
+_BLOCK_TITLE_BRUSH = QBrush(QColor("#00FF88"))
+_SCENE_BRUSH = QBrush(QColor("#000000"))
+_solid_brushes: Dict[int, QBrush] = {}
+
+# model dicts are plain trees, so the circular-reference bookkeeping is skipped
+_COMPACT_JSON = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, check_circular=False)
+_PRETTY_JSON = json.JSONEncoder(indent=2, ensure_ascii=False, check_circular=False)
+
+
+def _solid_brush(color: QColor) -> QBrush:
+    brush = _solid_brushes.get(color.rgba())
+    if brush is None:
+        brush = _solid_brushes[color.rgba()] = QBrush(color)
+    return brush
+
 
 def new_id() -> str:
     return str(uuid.uuid4())
 
 
+class _Kind:
+    """Wire endpoint kinds for Controller.find_object and the owner id
+       prefixes they are stored under in WireModel.start/end."""
+    BLOCK = "block"
+    JUNCTION = "junction"
+    INSTANCE = "instance"
+    BLOCK_PREFIX = "block:"
+    JUNCTION_PREFIX = "j:"
+
+
+def _split_endpoint(key: str) -> Tuple[str, str]:
+    """Split a stored owner key into (_Kind.*, id); the kind is empty
+       for keys with an unknown prefix."""
+    if key.startswith(_Kind.BLOCK_PREFIX):
+        return _Kind.BLOCK, key[len(_Kind.BLOCK_PREFIX):]
+    if key.startswith(_Kind.JUNCTION_PREFIX):
+        return _Kind.JUNCTION, key[len(_Kind.JUNCTION_PREFIX):]
+    if ":" in key:
+        return "", key
+    return _Kind.INSTANCE, key
+
+
+class _TrackedList(list):
+    """List that counts in-place edits, so indexes built from it
+       know when they are stale."""
+    version = 0
+
+    def append(self, item):
+        self.version += 1
+        super().append(item)
+
+    def extend(self, items):
+        self.version += 1
+        super().extend(items)
+
+    def insert(self, index, item):
+        self.version += 1
+        super().insert(index, item)
+
+    def remove(self, item):
+        self.version += 1
+        super().remove(item)
+
+    def pop(self, index=-1):
+        self.version += 1
+        return super().pop(index)
+
+    def clear(self):
+        self.version += 1
+        super().clear()
+
+    def sort(self, *args, **kwargs):
+        self.version += 1
+        super().sort(*args, **kwargs)
+
+    def reverse(self):
+        self.version += 1
+        super().reverse()
+
+    def __setitem__(self, index, value):
+        self.version += 1
+        super().__setitem__(index, value)
+
+    def __delitem__(self, index):
+        self.version += 1
+        super().__delitem__(index)
+
+    def __iadd__(self, items):
+        self.version += 1
+        super().__iadd__(items)
+        return self
+
+    def __imul__(self, n):
+        self.version += 1
+        super().__imul__(n)
+        return self
+
+
 @dataclass
 class ObjModelItem:
     id: int
 
 
-@dataclass
+@dataclass(slots=True)
 class PortModel:
     name: str
     x: float
@@ -41,7 +149,7 @@ class PortModel:
         return PortModel(name=self.name, x=self.x, y=self.y)
 
 
-@dataclass
+@dataclass(slots=True)
 class InstanceModel:
     id: str = field(default_factory=new_id)
     name: str = "Instance"
@@ -79,7 +187,7 @@ class InstanceModel:
         return new_inst
 
 
-@dataclass
+@dataclass(slots=True)
 class WireModel:
     id: str = field(default_factory=new_id)
     name: str = ""
@@ -119,14 +227,16 @@ class WireModel:
         
         # Update block-level pin references
         if block_id_map:
-            if self.start and self.start[0].startswith("block:"):
-                old_block_id = self.start[0].split(":", 1)[1]
-                if old_block_id in block_id_map:
-                    new_start = (f"block:{block_id_map[old_block_id]}", self.start[1])
-            if self.end and self.end[0].startswith("block:"):
-                old_block_id = self.end[0].split(":", 1)[1]
-                if old_block_id in block_id_map:
-                    new_end = (f"block:{block_id_map[old_block_id]}", self.end[1])
+            if self.start:
+                kind, old_block_id = _split_endpoint(self.start[0])
+                if kind == _Kind.BLOCK and old_block_id in block_id_map:
+                    new_start = (_Kind.BLOCK_PREFIX + block_id_map[old_block_id],
+                                 self.start[1])
+            if self.end:
+                kind, old_block_id = _split_endpoint(self.end[0])
+                if kind == _Kind.BLOCK and old_block_id in block_id_map:
+                    new_end = (_Kind.BLOCK_PREFIX + block_id_map[old_block_id],
+                               self.end[1])
         
         new_wire = WireModel(
             id=new_id(),
@@ -137,12 +247,13 @@ class WireModel:
         return new_wire
 
 
-@dataclass
+@dataclass(slots=True)
 class JunctionModel:
     id: str = field(default_factory=new_id)
     x: float = 0.0
     y: float = 0.0
     wire_id: Optional[str] = None  # host wire where junction was created
+    t: float = field(default=0.0, repr=False, compare=False)  # position along host wire
 
     obj_mod_el_id: int = None
 
@@ -177,7 +288,7 @@ class JunctionModel:
         return new_junc
 
 
-@dataclass
+@dataclass(slots=True)
 class BlockModel:
     id: str = field(default_factory=new_id)
     name: str = "Block"
@@ -192,6 +303,48 @@ class BlockModel:
 
     obj_mod_el_id: int = None
 
+    # attr -> (source list, its version, key -> item)
+    _indexes: Dict[str, Tuple[list, int, dict]] = field(
+        default_factory=dict, init=False, repr=False, compare=False)
+
+    _TRACKED = ("ports", "instances", "wires", "junctions")
+
+    def __setattr__(self, name, value):
+        if name in type(self)._TRACKED and not isinstance(value, _TrackedList):
+            value = _TrackedList(value)
+        object.__setattr__(self, name, value)
+
+    def _index(self, attr: str, key: str) -> dict:
+        lst = getattr(self, attr)
+        cached = self._indexes.get(attr)
+        if cached is not None and cached[0] is lst and cached[1] == lst.version:
+            return cached[2]
+        idx = {getattr(o, key): o for o in lst}
+        self._indexes[attr] = (lst, lst.version, idx)
+        return idx
+
+    @property
+    def wires_by_id(self) -> Dict[str, WireModel]:
+        return self._index("wires", "id")
+
+    @property
+    def instances_by_id(self) -> Dict[str, InstanceModel]:
+        return self._index("instances", "id")
+
+    @property
+    def junctions_by_id(self) -> Dict[str, JunctionModel]:
+        return self._index("junctions", "id")
+
+    @property
+    def ports_by_name(self) -> Dict[str, PortModel]:
+        return self._index("ports", "name")
+
+    def rename_port(self, port: PortModel, new_name: str):
+        """Rename a port in place; ports_by_name is keyed by name, so the
+           rename has to count as an edit of the ports list."""
+        port.name = new_name
+        self.ports.version += 1
+
     def to_dict(self):
         return {"id": self.id, "name": self.name, "x": self.x, "y": self.y,
                 "w": self.w, "h": self.h,
@@ -268,20 +421,67 @@ class BlockModel:
         return new_block
 
 
-def project_point_to_segment(p: QPointF, a: QPointF, b: QPointF) -> QPointF:
-    ax, ay = a.x(), a.y()
-    bx, by = b.x(), b.y()
-    px, py = p.x(), p.y()
+def project_xy_to_segment(px: float, py: float, ax: float, ay: float,
+                          bx: float, by: float) -> Tuple[float, float, float]:
+    """Project point (px, py) onto segment a-b given as raw coordinates.
+       Returns (qx, qy, t), where t in [0..1]"""
     vx = bx - ax
     vy = by - ay
-    wx = px - ax
-    wy = py - ay
     vlen2 = vx * vx + vy * vy
     if vlen2 == 0:
+        return ax, ay, 0.0
+    t = ((px - ax) * vx + (py - ay) * vy) / vlen2
+    if t < 0.0:
+        t = 0.0
+    elif t > 1.0:
+        t = 1.0
+    return ax + t * vx, ay + t * vy, t
+
+
+def project_xy_to_segments(px: float, py: float,
+                           segments: List[Tuple[float, float, float, float]]
+                           ) -> List[Tuple[float, float, float, float]]:
+    """Project point (px, py) onto every (ax, ay, bx, by) segment in one pass.
+       Returns (qx, qy, t, dist2) per segment, dist2 is squared distance."""
+    out = []
+    append = out.append
+    for ax, ay, bx, by in segments:
+        vx = bx - ax
+        vy = by - ay
+        vlen2 = vx * vx + vy * vy
+        if vlen2 == 0:
+            t = 0.0
+        else:
+            t = ((px - ax) * vx + (py - ay) * vy) / vlen2
+            if t < 0.0:
+                t = 0.0
+            elif t > 1.0:
+                t = 1.0
+        qx = ax + t * vx
+        qy = ay + t * vy
+        dx = px - qx
+        dy = py - qy
+        append((qx, qy, t, dx * dx + dy * dy))
+    return out
+
+
+def snap_to_rect_edge(lx: float, ly: float, w: float,
+                      h: float) -> Tuple[float, float]:
+    """Move local point (lx, ly) onto the nearest edge of a w x h rect.
+       Ties prefer left, right, top, bottom in that order."""
+    lx = min(max(lx, 0.0), w)
+    ly = min(max(ly, 0.0), h)
+    edges = (lx, w - lx, ly, h - ly)
+    return ((0.0, ly), (w, ly), (lx, 0.0), (lx, h))[edges.index(min(edges))]
+
+
+def project_point_to_segment(p: QPointF, a: QPointF, b: QPointF) -> QPointF:
+    ax, ay = a.x(), a.y()
+    bx, by = b.x(), b.y()
+    if ax == bx and ay == by:
         return a
-    t = (wx * vx + wy * vy) / vlen2
-    t = max(0.0, min(1.0, t))
-    return QPointF(ax + t * vx, ay + t * vy)
+    qx, qy, _ = project_xy_to_segment(p.x(), p.y(), ax, ay, bx, by)
+    return QPointF(qx, qy)
 
 
 class PortItem(QGraphicsEllipseItem):
@@ -296,13 +496,14 @@ class PortItem(QGraphicsEllipseItem):
         self.parent_item = parent_item
         self.controller = controller
         self.owner_id = owner_id
-        self.setBrush(QBrush(color))
-        self.setPen(QPen(Qt.GlobalColor.black, 1))
+        self.setBrush(_solid_brush(color))
+        self.setPen(_OUTLINE_PEN)
         self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsSelectable, True)
         self.setZValue(2)
         self.setAcceptedMouseButtons(Qt.MouseButton.LeftButton)
+        self.setCacheMode(QGraphicsItem.CacheMode.DeviceCoordinateCache)
         self.label = QGraphicsSimpleTextItem(model.name, self)
-        self.label.setBrush(QBrush(Qt.GlobalColor.white))
+        self.label.setBrush(_TEXT_BRUSH)
         self.label.setScale(0.8)
         self.update_from_model()
 
@@ -359,14 +560,15 @@ class InstanceItem(QGraphicsRectItem):
         super().__init__(0.0, 0.0, model.w, model.h)
         self.model = model
         self.controller = controller
-        self.setBrush(QBrush(QColor("#2E86C1")))
-        self.setPen(QPen(QColor("white"), 2))
+        self.setBrush(_INSTANCE_BRUSH)
+        self.setPen(_INSTANCE_PEN)
         self.setFlags(
             QGraphicsItem.GraphicsItemFlag.ItemIsMovable | QGraphicsItem.GraphicsItemFlag.ItemIsSelectable)
         self.setAcceptedMouseButtons(Qt.MouseButton.LeftButton)
+        self.setCacheMode(QGraphicsItem.CacheMode.DeviceCoordinateCache)
         self.setPos(model.x, model.y)
         self.title = QGraphicsSimpleTextItem(model.name, self)
-        self.title.setBrush(QBrush(Qt.GlobalColor.white))
+        self.title.setBrush(_TEXT_BRUSH)
         self.title.setPos(5, 4)
         self.port_items: Dict[str, PortItem] = {}
         for p in model.ports:
@@ -407,20 +609,26 @@ class WireItem(QGraphicsPathItem):
         self.start_obj = start_obj
         self.end_obj = end_obj
         self.model = model
-        self.setPen(QPen(QColor("#FFD700"), 2))
+        self.setPen(_WIRE_PEN)
         self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsSelectable, True)
         self.setAcceptHoverEvents(True)
         self.setZValue(1)
         self.label = QGraphicsSimpleTextItem("", self)
-        self.label.setBrush(QBrush(Qt.GlobalColor.white))
+        self.label.setBrush(_TEXT_BRUSH)
         self.label.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIgnoresTransformations, True)
         self.label.setZValue(2)
         self.update_label(getattr(self.model, "name", "") or "")
+        self._ends: Optional[Tuple[float, float, float, float]] = None
         self.update_path()
 
     def update_path(self):
         s = self.start_obj.scenePos()
         e = self.end_obj.scenePos()
+        ends = (s.x(), s.y(), e.x(), e.y())
+        # endpoints did not move: skip setPath and its geometry change
+        if ends == self._ends:
+            return
+        self._ends = ends
         path = QPainterPath(s)
         mid = (s + e) / 2
         path.cubicTo(mid, mid, e)
@@ -454,11 +662,11 @@ class WireItem(QGraphicsPathItem):
         return p
 
     def hoverEnterEvent(self, event):
-        self.setPen(QPen(QColor("#FFA500"), 3))
+        self.setPen(_WIRE_HOVER_PEN)
         super().hoverEnterEvent(event)
 
     def hoverLeaveEvent(self, event):
-        self.setPen(QPen(QColor("#FFD700"), 2))
+        self.setPen(_WIRE_PEN)
         super().hoverLeaveEvent(event)
 
     def mousePressEvent(self, event):
@@ -478,8 +686,8 @@ class JunctionItem(QGraphicsEllipseItem):
         self.model = model
         self.controller = controller
         self.attached_wire_id = attached_wire_id
-        self.setBrush(QBrush(QColor("#FF69B4")))
-        self.setPen(QPen(Qt.GlobalColor.black, 1))
+        self.setBrush(_JUNCTION_BRUSH)
+        self.setPen(_OUTLINE_PEN)
         # ensure interactivity
         self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsSelectable, True)
         self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsMovable, True)
@@ -537,22 +745,70 @@ class Controller:
     def __init__(self, scene: QGraphicsScene):
         self.scene = scene
         self.blocks: Dict[str, BlockFrame] = {}
+        # block name -> BlockFrame (first block registered under that name)
+        self.blocks_by_name: Dict[str, BlockFrame] = {}
         # Visual items for wires and junctions for the currently visible block:
         self.current_wire_items: Dict[str, WireItem] = {}
         self.current_junction_items: Dict[str, JunctionItem] = {}
+        # (instance_id, port_name) -> PortItem for instances of every block
+        self._inst_port_index: Dict[Tuple[str, str], PortItem] = {}
         self.temp_wire_start: Optional[Any] = None
         self.add_wire_mode = False
         self.add_junction_mode = False
         self._visible_block_id: Optional[str] = None
+        # nested batch() depth and wires whose path refresh is deferred
+        self._batch_depth = 0
+        self._dirty_wires: Dict[str, WireItem] = {}
+
+    @contextmanager
+    def batch(self):
+        """Defer wire path rebuilds until the outermost batch exits,
+           so each wire is rebuilt once however many updates touch it."""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._dirty_wires:
+                dirty, self._dirty_wires = self._dirty_wires, {}
+                for wi in dirty.values():
+                    if wi.scene() is not None:
+                        wi.update_path()
+
+    def _refresh_wire(self, wi: WireItem):
+        if self._batch_depth:
+            self._dirty_wires[wi.model.id] = wi
+        else:
+            wi.update_path()
 
     def add_block(self, name: str = "Block") -> 'BlockFrame':
         bm = BlockModel(name=name, x=40.0, y=60.0)
         bf = BlockFrame(bm, self)
         self.scene.addItem(bf)
         self.blocks[bm.id] = bf
+        self._index_block_name(bf)
         bf.setVisible(False)
         return bf
 
+    def _index_block_name(self, bf: 'BlockFrame'):
+        self.blocks_by_name.setdefault(bf.model.name, bf)
+
+    def _unindex_block_name(self, bf: 'BlockFrame'):
+        name = bf.model.name
+        if self.blocks_by_name.get(name) is not bf:
+            return
+        del self.blocks_by_name[name]
+        for other in self.blocks.values():
+            if other is not bf and other.model.name == name:
+                self.blocks_by_name[name] = other
+                break
+
+    def rename_block(self, block_frame: 'BlockFrame', new_name: str):
+        self._unindex_block_name(block_frame)
+        block_frame.model.name = new_name
+        block_frame.title.setText(new_name)
+        self._index_block_name(block_frame)
+
     def propagate_new_pin_to_instances(self, source_block_id: str,
                                        port_model: PortModel):
         for bf in self.blocks.values():
@@ -571,12 +827,22 @@ class Controller:
                                 inst_item.port_items[pm.name] = PortItem(
                                     inst_item, pm, controller=self,
                                     owner_id=inst.id, color=QColor("orange"))
+                                self._inst_port_index[(inst.id, pm.name)] = \
+                                    inst_item.port_items[pm.name]
                         else:
                             pin_vis = inst_item.port_items[port_model.name]
                             pin_vis.model.x = port_model.x
                             pin_vis.model.y = port_model.y
                             pin_vis.update_from_model()
 
+    def _register_instance_ports(self, inst_item: 'InstanceItem'):
+        for pname, port_item in inst_item.port_items.items():
+            self._inst_port_index[(inst_item.model.id, pname)] = port_item
+
+    def _unregister_instance_ports(self, inst_item: 'InstanceItem'):
+        for pname in inst_item.port_items:
+            self._inst_port_index.pop((inst_item.model.id, pname), None)
+
     def _collect_wires_connected_to_obj(self, obj: Any) -> List[str]:
         ids = []
         for wid, wv in list(self.current_wire_items.items()):
@@ -592,8 +858,7 @@ class Controller:
             except Exception:
                 pass
             del self.current_wire_items[wid]
-        for bm in self.blocks.values():
-            bm.model.wires = [w for w in bm.model.wires if w.id != wid]
+        self._drop_wire_model(wid)
         for bm in self.blocks.values():
             for jm in list(bm.model.junctions):
                 if jm.wire_id == wid:
@@ -607,6 +872,38 @@ class Controller:
                         del self.current_junction_items[jm.id]
         self._cleanup_orphan_junctions()
 
+    def delete_many(self, blocks=(), instances=(), ports=(), wires=(),
+                    junctions=()) -> List[PortItem]:
+        """Delete several items, then rebuild the visible block once.
+           Returns instance pins that were skipped (only block pins can go)."""
+        skipped = []
+        for b in blocks:
+            self.delete_block(b)
+        for inst in instances:
+            if inst.scene() is not None:
+                self.delete_instance(inst)
+        for p in ports:
+            if p.owner_id and p.owner_id.startswith(_Kind.BLOCK_PREFIX):
+                if p.scene() is not None:
+                    self.delete_block_pin(p)
+            else:
+                skipped.append(p)
+        for w in wires:
+            if w.scene() is not None:
+                self.delete_wire(w)
+        for j in junctions:
+            if j.scene() is not None:
+                self.delete_junction(j)
+        if self._visible_block_id in self.blocks:
+            self.show_only_block(self._visible_block_id)
+        return skipped
+
+    def _drop_wire_model(self, wid: str):
+        for bm in self.blocks.values():
+            wm = bm.model.wires_by_id.get(wid)
+            if wm is not None:
+                bm.model.wires.remove(wm)
+
     def delete_junction(self, junction_item: JunctionItem):
         jid = junction_item.model.id
         if jid in self.current_junction_items:
@@ -618,12 +915,13 @@ class Controller:
         for bm in self.blocks.values():
             bm.model.junctions = [j for j in bm.model.junctions if j.id != jid]
         wires_to_delete = set()
+        jkey = _Kind.JUNCTION_PREFIX + jid
         for bm in self.blocks.values():
             for w in bm.model.wires:
                 if (isinstance(w.start, (list, tuple)) and len(w.start) and
-                    w.start[0] == f"j:{jid}") \
+                    w.start[0] == jkey) \
                         or (isinstance(w.end, (list, tuple)) and len(w.end) and
-                            w.end[0] == f"j:{jid}"):
+                            w.end[0] == jkey):
                     wires_to_delete.add(w.id)
         for wid in list(wires_to_delete):
             if wid in self.current_wire_items:
@@ -632,8 +930,7 @@ class Controller:
                 except Exception:
                     pass
                 del self.current_wire_items[wid]
-            for bm in self.blocks.values():
-                bm.model.wires = [w for w in bm.model.wires if w.id != wid]
+            self._drop_wire_model(wid)
         self._cleanup_orphan_junctions()
 
     def delete_instance(self, inst_item: 'InstanceItem'):
@@ -649,8 +946,7 @@ class Controller:
                     pass
                 if wid in self.current_wire_items:
                     del self.current_wire_items[wid]
-            for bm in self.blocks.values():
-                bm.model.wires = [w for w in bm.model.wires if w.id != wid]
+            self._drop_wire_model(wid)
         parent = inst_item.parentItem()
         if isinstance(parent, BlockFrame):
             inst_id = inst_item.model.id
@@ -658,13 +954,14 @@ class Controller:
                                       i.id != inst_id]
             if inst_id in parent.instance_items:
                 del parent.instance_items[inst_id]
+        self._unregister_instance_ports(inst_item)
         self.scene.removeItem(inst_item)
         self._cleanup_orphan_junctions()
 
     def delete_block_pin(self, pin_item: PortItem):
-        if not pin_item.owner_id or not pin_item.owner_id.startswith("block:"):
+        kind, block_id = _split_endpoint(pin_item.owner_id or "")
+        if kind != _Kind.BLOCK:
             return
-        block_id = pin_item.owner_id.split(":", 1)[1]
         pin_name = pin_item.model.name
         visuals = []
         bf = self.blocks.get(block_id)
@@ -689,8 +986,7 @@ class Controller:
                     del self.current_wire_items[wid]
                 except Exception:
                     pass
-            for bm in self.blocks.values():
-                bm.model.wires = [w for w in bm.model.wires if w.id != wid]
+            self._drop_wire_model(wid)
         if bf:
             block_name = bf.model.name
 
@@ -706,6 +1002,8 @@ class Controller:
                         inst_item = other_bf.instance_items.get(inst.id)
                         if inst_item and pin_name in inst_item.port_items:
                             pvis = inst_item.port_items.pop(pin_name)
+                            self._inst_port_index.pop((inst.id, pin_name),
+                                                      None)
                             self.scene.removeItem(pvis)
         self._cleanup_orphan_junctions()
 
@@ -740,8 +1038,7 @@ class Controller:
                     del self.current_wire_items[wid]
                 except Exception:
                     pass
-            for bm in self.blocks.values():
-                bm.model.wires = [w for w in bm.model.wires if w.id != wid]
+            self._drop_wire_model(wid)
         for other_bf in list(self.blocks.values()):
             inst_ids = [inst.id for inst in other_bf.model.instances if
                         inst.block_name == block_name]
@@ -754,6 +1051,8 @@ class Controller:
                                         inst.block_name != block_name]
         if block_id in self.blocks:
             if bf:
+                for inst_item in bf.instance_items.values():
+                    self._unregister_instance_ports(inst_item)
                 for pv in list(bf.port_items.values()):
                     try:
                         self.scene.removeItem(pv)
@@ -764,6 +1063,7 @@ class Controller:
                 except Exception:
                     pass
             del self.blocks[block_id]
+            self._unindex_block_name(block_frame)
         self._cleanup_orphan_junctions()
 
     def _cleanup_orphan_junctions(self):
@@ -784,7 +1084,7 @@ class Controller:
         for jid in list(self.current_junction_items.keys()):
             found = False
             for bm in self.blocks.values():
-                if any(j.id == jid for j in bm.model.junctions):
+                if jid in bm.model.junctions_by_id:
                     found = True
                     break
             if not found:
@@ -803,21 +1103,39 @@ class Controller:
     def set_add_junction_mode(self, enabled: bool):
         self.add_junction_mode = enabled
 
+    def nearest_wire_at(self, scene_pos: QPointF,
+                        tolerance: float = 6.0) -> Optional[WireItem]:
+        """Visible wire closest to scene_pos, if within tolerance."""
+        wires = [wi for wi in self.current_wire_items.values()
+                 if wi.start_obj is not None and wi.end_obj is not None]
+        if not wires:
+            return None
+        segments = []
+        for wi in wires:
+            a = wi.start_obj.scenePos()
+            b = wi.end_obj.scenePos()
+            segments.append((a.x(), a.y(), b.x(), b.y()))
+        hits = project_xy_to_segments(scene_pos.x(), scene_pos.y(), segments)
+        best = min(range(len(hits)), key=lambda i: hits[i][3])
+        if hits[best][3] > tolerance * tolerance:
+            return None
+        return wires[best]
+
     def start_wire(self, obj: Any):
         if not self.add_wire_mode:
             return
         self.temp_wire_start = obj
         if isinstance(obj, (PortItem, JunctionItem)):
-            obj.setBrush(QBrush(QColor("red")))
+            obj.setBrush(_ACTIVE_PIN_BRUSH)
 
     def _restore_pin_color(self, item):
         if isinstance(item, PortItem):
-            if item.owner_id and item.owner_id.startswith("block:"):
-                item.setBrush(QBrush(QColor("lime")))
+            if item.owner_id and item.owner_id.startswith(_Kind.BLOCK_PREFIX):
+                item.setBrush(_BLOCK_PIN_BRUSH)
             else:
-                item.setBrush(QBrush(QColor("orange")))
+                item.setBrush(_INSTANCE_PIN_BRUSH)
         elif isinstance(item, JunctionItem):
-            item.setBrush(QBrush(QColor("#FF69B4")))
+            item.setBrush(_JUNCTION_BRUSH)
 
     def finish_wire(self, obj: Any):
         """Finish creating a wire between two pins or junctions."""
@@ -857,7 +1175,7 @@ class Controller:
             if isinstance(o, PortItem):
                 return o.owner_id or "unknown", o.model.name
             if isinstance(o, JunctionItem):
-                return f"j:{o.model.id}", ""
+                return _Kind.JUNCTION_PREFIX + o.model.id, ""
             return "unknown", ""
 
         wm = WireModel(start=id_for(start), end=id_for(end))
@@ -890,14 +1208,6 @@ class Controller:
 
         wi.update_path()
 
-        # restore interactivity
-        for obj in (start, end):
-            if isinstance(obj, (PortItem, JunctionItem)):
-                obj.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsMovable, True)
-                obj.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsSelectable,
-                            True)
-                obj.setAcceptedMouseButtons(Qt.MouseButton.LeftButton)
-
         # disable add-wire mode after creating one wire
         self.set_add_wire_mode(False)
 
@@ -913,7 +1223,7 @@ class Controller:
         wire_model = attached_wire.model
         owner_block = None
         for bid, bf in self.blocks.items():
-            if any(w.id == wire_model.id for w in bf.model.wires):
+            if wire_model.id in bf.model.wires_by_id:
                 owner_block = bf
                 break
         if owner_block is None:
@@ -922,12 +1232,7 @@ class Controller:
                            wire_id=wire_model.id)
         owner_block.model.junctions.append(jm)
         ji = JunctionItem(jm, self, attached_wire_id=wire_model.id)
-        # ensure interactivity
-        ji.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsMovable, True)
-        ji.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsSelectable, True)
-        ji.setAcceptedMouseButtons(Qt.MouseButton.LeftButton)
         self.scene.addItem(ji)
-        ji.setZValue(100)
         a = attached_wire.start_obj.scenePos()
         b = attached_wire.end_obj.scenePos()
         proj = project_point_to_segment(scene_pos, a, b)
@@ -944,11 +1249,12 @@ class Controller:
 
         a = w_item.start_obj.scenePos()
         b = w_item.end_obj.scenePos()
+        ax, ay, bx, by = a.x(), a.y(), b.x(), b.y()
 
         # найти блок, которому принадлежит провод
         block = None
         for bid, bf in self.blocks.items():
-            if any(w.id == wire_id for w in bf.model.wires):
+            if wire_id in bf.model.wires_by_id:
                 block = bf
                 break
         if not block:
@@ -963,16 +1269,16 @@ class Controller:
             if not ji:
                 continue
 
-            proj, t = project_point_to_segment_local(QPointF(jm.x, jm.y), a, b)
-            jm.t = t
-            jm.x, jm.y = proj.x(), proj.y()
-            ji.setPos(proj)
+            jm.x, jm.y, jm.t = project_xy_to_segment(jm.x, jm.y,
+                                                     ax, ay, bx, by)
+            ji.setPos(jm.x, jm.y)
             moved_junctions.append(jm.id)
 
         # теперь обновляем все провода, которые подключены к этим junctions
         if not moved_junctions:
             return
 
+        moved_keys = {_Kind.JUNCTION_PREFIX + jid for jid in moved_junctions}
         for wm in block.model.wires:
             # если провод не из этого блока — пропускаем
             if wm.id not in self.current_wire_items:
@@ -981,55 +1287,95 @@ class Controller:
             # если этот провод начинается или заканчивается на один из moved_junctions
             start_key = wm.start[0] if wm.start else ""
             end_key = wm.end[0] if wm.end else ""
-            for jid in moved_junctions:
-                if start_key == f"j:{jid}" or end_key == f"j:{jid}":
-                    wi2.update_path()
-                    break
+            if start_key in moved_keys or end_key in moved_keys:
+                self._refresh_wire(wi2)
 
         # и наконец, обновляем host-wire тоже
         if wire_id in self.current_wire_items:
-            self.current_wire_items[wire_id].update_path()
+            self._refresh_wire(self.current_wire_items[wire_id])
+
+    def _reproject_junctions(self, block: 'BlockFrame'):
+        """Same as _reproject_junctions_for_wire for every shown wire of
+           the block, in a single pass over its junctions and wires."""
+        wire_items = self.current_wire_items
+        junction_items = self.current_junction_items
+        by_wire: Dict[str, List[JunctionModel]] = {}
+        for jm in block.model.junctions:
+            if jm.wire_id in wire_items and jm.id in junction_items:
+                by_wire.setdefault(jm.wire_id, []).append(jm)
+        if not by_wire:
+            return
+
+        moved = set()
+        for wid, wi in list(wire_items.items()):
+            jms = by_wire.get(wid)
+            if not jms:
+                continue
+            a = wi.start_obj.scenePos()
+            b = wi.end_obj.scenePos()
+            ax, ay, bx, by = a.x(), a.y(), b.x(), b.y()
+            for jm in jms:
+                jm.x, jm.y, jm.t = project_xy_to_segment(jm.x, jm.y,
+                                                         ax, ay, bx, by)
+                junction_items[jm.id].setPos(jm.x, jm.y)
+                moved.add(_Kind.JUNCTION_PREFIX + jm.id)
+            self._refresh_wire(wi)
+
+        # провода, которые начинаются или заканчиваются на сдвинутых junctions
+        for wm in block.model.wires:
+            wi = wire_items.get(wm.id)
+            if wi is None:
+                continue
+            if (wm.start and wm.start[0] in moved) or \
+                    (wm.end and wm.end[0] in moved):
+                self._refresh_wire(wi)
 
     def update_wires_for_pin(self, pin_item: PortItem):
         for wid, wv in list(self.current_wire_items.items()):
             if wv.start_obj == pin_item or wv.end_obj == pin_item:
-                wv.update_path()
+                self._refresh_wire(wv)
                 # reproject junctions only for wires where those junctions are host (jm.wire_id == wid)
                 self._reproject_junctions_for_wire(wid)
 
     def update_wires_for_junction(self, junction_item: JunctionItem):
         for wid, wv in list(self.current_wire_items.items()):
             if wv.start_obj == junction_item or wv.end_obj == junction_item:
-                wv.update_path()
+                self._refresh_wire(wv)
                 self._reproject_junctions_for_wire(wid)
 
     def update_wires_for_instance(self, inst_item: InstanceItem):
-        for p in inst_item.port_items.values():
-            self.update_wires_for_pin(p)
+        with self.batch():
+            for p in inst_item.port_items.values():
+                self.update_wires_for_pin(p)
 
     def update_wires_for_block_move(self, block_frame: 'BlockFrame', dx: float,
                                     dy: float):
         """Move junctions (models and visuals) by dx,dy and update wire visuals.
            Do NOT reproject junctions that belong to this block — they moved rigidly."""
-        # move junction models & visuals
-        for jm in block_frame.model.junctions:
-            jm.x += dx
-            jm.y += dy
-            if jm.id in self.current_junction_items:
-                ji = self.current_junction_items[jm.id]
-                ji.setPos(QPointF(jm.x, jm.y))
-                ji.model.x, ji.model.y = jm.x, jm.y
-
-        # update wire visuals for this block
-        for wm in block_frame.model.wires:
-            wid = wm.id
-            wi = self.current_wire_items.get(wid)
-            if wi:
-                wi.update_path()
-                # do not reproject junctions inside this block (they already moved)
-        # nevertheless reproject junctions for any other wires whose geometry changed
-        for wid in list(self.current_wire_items.keys()):
-            self._reproject_junctions_for_wire(wid)
+        with self.batch():
+            # move junction models & visuals (resizing passes a zero delta)
+            if dx != 0.0 or dy != 0.0:
+                junction_items = self.current_junction_items
+                for jm in block_frame.model.junctions:
+                    jm.x += dx
+                    jm.y += dy
+                    ji = junction_items.get(jm.id)
+                    if ji is not None:
+                        # ji.model is jm, so only the visual needs updating
+                        ji.setPos(jm.x, jm.y)
+
+            # update wire visuals for this block
+            for wm in block_frame.model.wires:
+                wid = wm.id
+                wi = self.current_wire_items.get(wid)
+                if wi:
+                    self._refresh_wire(wi)
+                    # do not reproject junctions inside this block (they already moved)
+            # nevertheless reproject junctions for any other wires whose geometry changed
+            shown = self.current_wire_items
+            for bf in list(self.blocks.values()):
+                if not bf.model.wires_by_id.keys().isdisjoint(shown):
+                    self._reproject_junctions(bf)
 
     def show_only_block(self, block_id: str):
         self._visible_block_id = block_id
@@ -1053,15 +1399,13 @@ class Controller:
             return
         for jm in bf.model.junctions:
             ji = JunctionItem(jm, self, attached_wire_id=jm.wire_id)
-            ji.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsMovable, True)
-            ji.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIsSelectable, True)
-            ji.setAcceptedMouseButtons(Qt.MouseButton.LeftButton)
             self.scene.addItem(ji)
             ji.setPos(QPointF(jm.x, jm.y))
             self.current_junction_items[jm.id] = ji
         for wm in bf.model.wires:
-            start_obj = self.find_object_by_id_tuple(wm.start, for_block=bf)
-            end_obj = self.find_object_by_id_tuple(wm.end, for_block=bf)
+            (s_key, s_pin), (e_key, e_pin) = wm.start, wm.end
+            start_obj = self.find_object(*_split_endpoint(s_key), s_pin, bf)
+            end_obj = self.find_object(*_split_endpoint(e_key), e_pin, bf)
             if start_obj and end_obj:
                 wi = WireItem(start_obj, end_obj, wm)
                 wi.controller = self
@@ -1079,63 +1423,94 @@ class Controller:
                     ji.setPos(proj)
                     ji.model.x, ji.model.y = proj.x(), proj.y()
 
+    def serialize_scene(self, compact: bool = False) -> bytes:
+        """Scene as UTF-8 JSON, exactly as save_scene writes it;
+           compact drops the indentation (history snapshots)."""
+        data = {"blocks": [bf.model.to_dict() for bf in self.blocks.values()]}
+        encoder = _COMPACT_JSON if compact else _PRETTY_JSON
+        return encoder.encode(data).encode("utf8")
+
     def save_scene(self, filename: str):
-        data = {"blocks": []}
-        for bf in self.blocks.values():
-            data["blocks"].append(bf.model.to_dict())
-        with open(filename, "w", encoding="utf8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # write next to the target and swap it in, so a crash never leaves half a file
+        tmp = f"{filename}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.serialize_scene())
+        os.replace(tmp, filename)
         # QMessageBox.information(None, "Saved", f"Saved to {filename}")
 
     def load_scene(self, filename: str):
         try:
-            with open(filename, "r", encoding="utf8") as f:
-                data = json.load(f)
+            with open(filename, "rb") as f:
+                raw = f.read()
         except Exception as e:
             QMessageBox.critical(None, "Error", f"Failed to load: {e}")
             return
-        self.scene.clear()
-        self.blocks.clear()
-        self.current_wire_items.clear()
-        self.current_junction_items.clear()
-        for bd in data.get("blocks", []):
-            bm = BlockModel.from_dict(bd)
-            bf = BlockFrame(bm, self)
-            self.scene.addItem(bf)
-            bf.setVisible(False)
-            self.blocks[bm.id] = bf
-        if self.blocks:
-            first_id = next(iter(self.blocks.keys()))
-            self.show_only_block(first_id)
-
-    def find_object_by_id_tuple(self, info: Tuple[str, str],
-                                for_block: Optional['BlockFrame'] = None) -> \
+        self.load_scene_from_bytes(raw)
+
+    def load_scene_from_bytes(self, raw: bytes):
+        """Rebuild the scene from serialize_scene() output."""
+        try:
+            data = json.loads(raw)
+        except Exception as e:
+            QMessageBox.critical(None, "Error", f"Failed to load: {e}")
+            return
+        # the scene is rebuilt item by item; keep it quiet until the end
+        with QSignalBlocker(self.scene), self.batch():
+            self.scene.clear()
+            self.blocks.clear()
+            self.blocks_by_name.clear()
+            self.current_wire_items.clear()
+            self.current_junction_items.clear()
+            self._inst_port_index.clear()
+            for bd in data.get("blocks", []):
+                bm = BlockModel.from_dict(bd)
+                bf = BlockFrame(bm, self)
+                self.scene.addItem(bf)
+                bf.setVisible(False)
+                self.blocks[bm.id] = bf
+                self._index_block_name(bf)
+            if self.blocks:
+                first_id = next(iter(self.blocks.keys()))
+                self.show_only_block(first_id)
+        self.scene.update()
+
+    def find_object(self, kind: str, oid: str, pname: str = "",
+                    for_block: Optional['BlockFrame'] = None) -> \
     Optional[Any]:
-        key, pname = info
-        if key.startswith("j:"):
-            jid = key.split(":", 1)[1]
-            return self.current_junction_items.get(jid)
-        if key.startswith("block:"):
-            _, bid = key.split(":", 1)
-            bf = self.blocks.get(bid)
-            if bf and pname in bf.port_items:
-                return bf.port_items[pname]
+        """Look up a wire endpoint by kind ('block', 'junction' or
+           'instance'), owner id and pin name."""
+        if kind == _Kind.JUNCTION:
+            return self.current_junction_items.get(oid)
+        if kind == _Kind.BLOCK:
+            bf = self.blocks.get(oid)
+            return bf.port_items.get(pname) if bf else None
+        if kind != _Kind.INSTANCE:
             return None
         if for_block:
-            inst = for_block.instance_items.get(key)
-            if inst and pname in inst.port_items:
-                return inst.port_items[pname]
-        for bf in self.blocks.values():
-            inst_item = bf.instance_items.get(key)
-            if inst_item and pname in inst_item.port_items:
-                return inst_item.port_items[pname]
-        return None
+            inst = for_block.instance_items.get(oid)
+            if inst:
+                pi = inst.port_items.get(pname)
+                if pi is not None:
+                    return pi
+        return self._inst_port_index.get((oid, pname))
+
+    def find_object_by_id_tuple(self, info: Tuple[str, ...],
+                                for_block: Optional['BlockFrame'] = None) -> \
+    Optional[Any]:
+        """Same as find_object for a stored ("block:<id>" | "j:<id>" |
+           "<instance id>", pin name) endpoint, or an unformatted
+           (_Kind.*, id, pin name) triple."""
+        if len(info) == 3:
+            return self.find_object(*info, for_block=for_block)
+        key, pname = info
+        return self.find_object(*_split_endpoint(key), pname, for_block)
 
     def owner_block_of_port(self, port_item: PortItem) -> Optional[str]:
         if not port_item.owner_id:
             return None
-        if port_item.owner_id.startswith("block:"):
-            return port_item.owner_id.split(":", 1)[1]
+        kind, oid = _split_endpoint(port_item.owner_id)
+        if kind == _Kind.BLOCK:
+            return oid
         for bid, bf in self.blocks.items():
             if port_item.owner_id in bf.instance_items:
                 return bid
@@ -1150,6 +1525,7 @@ class Controller:
         new_bf = BlockFrame(new_model, self)
         self.scene.addItem(new_bf)
         self.blocks[new_model.id] = new_bf
+        self._index_block_name(new_bf)
         new_bf.setVisible(False)
 
         return new_bf
@@ -1217,8 +1593,8 @@ class BlockFrame(QGraphicsRectItem):
         self.port_items: Dict[str, PortItem] = {}
         self.instance_items: Dict[str, InstanceItem] = {}
 
-        self.setPen(QPen(QColor("#888888"), 2))
-        self.setBrush(QBrush(QColor("#0b0b0b")))
+        self.setPen(_BLOCK_PEN)
+        self.setBrush(_BLOCK_BRUSH)
         self.setFlags(
             QGraphicsItem.GraphicsItemFlag.ItemIsMovable |
             QGraphicsItem.GraphicsItemFlag.ItemIsSelectable |
@@ -1230,7 +1606,7 @@ class BlockFrame(QGraphicsRectItem):
         self.setPos(model.x, model.y)
 
         self.title = QGraphicsSimpleTextItem(model.name, self)
-        self.title.setBrush(QBrush(QColor("#00FF88")))
+        self.title.setBrush(_BLOCK_TITLE_BRUSH)
         self.title.setPos(5, -20)
 
         self._resizing = False
@@ -1253,7 +1629,7 @@ class BlockFrame(QGraphicsRectItem):
             existing.update_from_model()
             return existing
         p = PortItem(self, pm, controller=self.controller,
-                     owner_id=f"block:{self.model.id}", color=QColor("lime"))
+                     owner_id=_Kind.BLOCK_PREFIX + self.model.id, color=QColor("lime"))
         self.port_items[pm.name] = p
         return p
 
@@ -1269,6 +1645,7 @@ class BlockFrame(QGraphicsRectItem):
                                                     owner_id=inst_model.id,
                                                     color=QColor("orange"))
         self.instance_items[inst_model.id] = item
+        self.controller._register_instance_ports(item)
         return item
 
     def itemChange(self, change, value):
@@ -1440,19 +1817,62 @@ class BlockFrame(QGraphicsRectItem):
         return pm
 
 
+class EditorScene(QGraphicsScene):
+    """Scene that routes clicks to the active editor mode.
+
+    Python is entered only on mouse presses, instead of on every viewport
+    event as with an installed event filter."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._mode: Optional[str] = None
+        self._handlers: Dict[str, Any] = {}
+
+    def set_mode_handler(self, mode: str, handler):
+        self._handlers[mode] = handler
+
+    def set_mode(self, mode: Optional[str]):
+        """Route clicks to the handler of mode; None passes them through."""
+        self._mode = mode
+
+    def item_of_type_at(self, pos: QPointF, types) -> Optional[QGraphicsItem]:
+        """Topmost item under pos that is an instance of types."""
+        top = self.itemAt(pos, QTransform())
+        if top is None or isinstance(top, types):
+            return top
+        for it in self.items(pos):
+            if isinstance(it, types):
+                return it
+        return None
+
+    def mousePressEvent(self, ev):
+        handler = self._handlers.get(self._mode) if self._mode else None
+        if handler is not None and handler(ev):
+            ev.accept()
+            return
+        super().mousePressEvent(ev)
+
+
 class BlockEditor(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Block Editor — final (PyQt6)")
         self.resize(1100, 750)
-        self.scene = QGraphicsScene()
-        self.scene.setBackgroundBrush(QBrush(QColor("#000000")))
+        self.scene = EditorScene()
+        self.scene.setBackgroundBrush(_SCENE_BRUSH)
+        # wires and junctions move constantly, BSP rebuilds cost more
+        # than linear lookups
+        self.scene.setItemIndexMethod(
+            QGraphicsScene.ItemIndexMethod.NoIndex)
 
         self.view = QGraphicsView(self.scene)
-        try:
-            self.view.setRenderHints(QPainter.RenderHint.Antialiasing)
-        except Exception:
-            pass
+        self.view.setRenderHints(QPainter.RenderHint(0))
+        self.view.setViewportUpdateMode(
+            QGraphicsView.ViewportUpdateMode.FullViewportUpdate)
+        self.view.setOptimizationFlag(
+            QGraphicsView.OptimizationFlag.DontSavePainterState, True)
+        self.view.setOptimizationFlag(
+            QGraphicsView.OptimizationFlag.DontAdjustForAntialiasing, True)
 
         self.controller = Controller(self.scene)
 
@@ -1466,6 +1886,7 @@ class BlockEditor(QWidget):
         btn_save = QPushButton("Save")
         btn_load = QPushButton("Load")
         self.combo_blocks = QComboBox()
+        self._combo_sig: Tuple[Tuple[str, str], ...] = ()
 
         top_layout.addWidget(btn_add_block)
         top_layout.addWidget(self.combo_blocks)
@@ -1487,15 +1908,20 @@ class BlockEditor(QWidget):
         btn_add_wire.clicked.connect(self._on_add_wire)
         btn_add_junction.clicked.connect(self._on_add_junction)
         btn_delete.clicked.connect(self._on_delete_selected)
-        btn_save.clicked.connect(
-            lambda: self.controller.save_scene("scene_blocks.json"))
-        btn_load.clicked.connect(lambda: self._on_load_scene())
+        btn_save.clicked.connect(self._on_save)
+        btn_load.clicked.connect(self._on_load_scene)
 
         self.combo_blocks.currentIndexChanged.connect(self._on_combo_changed)
         self._current_block_id: Optional[str] = None
+        self._pending_combo_idx = -1
+        self._combo_change_scheduled = False
 
         self.active_mode = None
-        self.current_filter = None
+        self._pending_instance: Optional[Tuple[BlockFrame, BlockFrame]] = None
+        self.scene.set_mode_handler('instance', self._handle_instance_click)
+        self.scene.set_mode_handler('pin', self._handle_pin_click)
+        self.scene.set_mode_handler('wire', self._handle_wire_click)
+        self.scene.set_mode_handler('junction', self._handle_junction_click)
 
         b1 = self.controller.add_block("BlockA")
         b2 = self.controller.add_block("BlockB")
@@ -1506,15 +1932,19 @@ class BlockEditor(QWidget):
             self._show_block_by_index(0)
 
     def _refresh_combo(self):
+        sig = tuple((bf.model.id, bf.model.name)
+                    for bf in self.controller.blocks.values())
+        if sig == self._combo_sig:
+            return
+        self._combo_sig = sig
         cur = self.combo_blocks.currentText()
-        self.combo_blocks.blockSignals(True)
-        self.combo_blocks.clear()
-        for bf in self.controller.blocks.values():
-            self.combo_blocks.addItem(bf.model.name, bf.model.id)
-        idx = self.combo_blocks.findText(cur)
-        if idx >= 0:
-            self.combo_blocks.setCurrentIndex(idx)
-        self.combo_blocks.blockSignals(False)
+        with QSignalBlocker(self.combo_blocks):
+            self.combo_blocks.clear()
+            for bf in self.controller.blocks.values():
+                self.combo_blocks.addItem(bf.model.name, bf.model.id)
+            idx = self.combo_blocks.findText(cur)
+            if idx >= 0:
+                self.combo_blocks.setCurrentIndex(idx)
 
     def _get_block_id_by_index(self, idx: int) -> Optional[str]:
         if idx < 0:
@@ -1528,7 +1958,17 @@ class BlockEditor(QWidget):
         self.controller.show_only_block(bid)
         self._current_block_id = bid
 
+    @pyqtSlot(int)
     def _on_combo_changed(self, idx: int):
+        # coalesce bursts of index changes into one switch
+        self._pending_combo_idx = idx
+        if not self._combo_change_scheduled:
+            self._combo_change_scheduled = True
+            QTimer.singleShot(0, self._process_combo_change)
+
+    def _process_combo_change(self):
+        self._combo_change_scheduled = False
+        idx = self._pending_combo_idx
         self._deactivate_mode()
         new_bid = self._get_block_id_by_index(idx)
         if new_bid is None:
@@ -1543,29 +1983,27 @@ class BlockEditor(QWidget):
         if ans == QMessageBox.StandardButton.Cancel:
             cur_idx = self.combo_blocks.findData(self._current_block_id)
             if cur_idx >= 0:
-                self.combo_blocks.blockSignals(True)
-                self.combo_blocks.setCurrentIndex(cur_idx)
-                self.combo_blocks.blockSignals(False)
+                with QSignalBlocker(self.combo_blocks):
+                    self.combo_blocks.setCurrentIndex(cur_idx)
             return
         if ans == QMessageBox.StandardButton.Yes:
             self.controller.save_scene("scene_blocks.json")
         self._show_block_by_index(idx)
 
-    def _deactivate_mode(self):
-        if self.current_filter:
-            try:
-                self.view.viewport().removeEventFilter(self.current_filter)
-            except Exception:
-                pass
-            self.current_filter = None
+    def _set_mode(self, mode: Optional[str]):
+        self.active_mode = mode
+        self.scene.set_mode(mode)
 
+    def _deactivate_mode(self):
         if self.active_mode == 'wire':
             self.controller.set_add_wire_mode(False)
         elif self.active_mode == 'junction':
             self.controller.set_add_junction_mode(False)
 
-        self.active_mode = None
+        self._pending_instance = None
+        self._set_mode(None)
 
+    @pyqtSlot()
     def _on_add_block(self):
         self._deactivate_mode()
         name, ok = QInputDialog.getText(self, "New block", "Block name:",
@@ -1579,6 +2017,7 @@ class BlockEditor(QWidget):
             self.combo_blocks.setCurrentIndex(idx)
             self._show_block_by_index(idx)
 
+    @pyqtSlot()
     def _on_add_instance(self):
         self._deactivate_mode()
         if len(self.controller.blocks) < 2:
@@ -1595,198 +2034,142 @@ class BlockEditor(QWidget):
             QMessageBox.warning(self, "Error",
                                 "Cannot insert block into itself.")
             return
-        child_frame = next(bf for bf in self.controller.blocks.values() if
-                           bf.model.name == child_name)
-        parent_frame = next(bf for bf in self.controller.blocks.values() if
-                            bf.model.name == parent_name)
+        child_frame = self.controller.blocks_by_name[child_name]
+        parent_frame = self.controller.blocks_by_name[parent_name]
         QMessageBox.information(self, "Place",
                                 "Click inside parent block to place instance.")
+        self._pending_instance = (child_frame, parent_frame)
+        self._set_mode('instance')
+
+    def _handle_instance_click(self, ev) -> bool:
+        child_frame, parent_frame = self._pending_instance
+        pos = ev.scenePos()
+        if parent_frame in self.scene.items(pos):
+            local = parent_frame.mapFromScene(pos)
+            parent_frame.add_instance(child_frame.model, local)
+            self._refresh_combo()
+            self._deactivate_mode()
+            return True
+        return False
 
-        def handler(ev):
-            pos = self.view.mapToScene(ev.position().toPoint())
-            if parent_frame.mapRectToScene(parent_frame.rect()).contains(pos):
-                local = parent_frame.mapFromScene(pos)
-                parent_frame.add_instance(child_frame.model, local)
-                self._refresh_combo()
-                self.view.viewport().removeEventFilter(filter_obj)
-                return True
-            return False
-
-        class OneShot(QObject):
-            def eventFilter(self, obj, ev):
-                if ev.type() == 2: return handler(ev)
-                return False
-
-        filter_obj = OneShot()
-        self.view.viewport().installEventFilter(filter_obj)
-
+    @pyqtSlot()
     def _on_add_pin(self):
         self._deactivate_mode()
         QMessageBox.information(self, "Add Pin",
                                 "Click inside the visible block to add a pin (copied into its instances).")
+        self._set_mode('pin')
 
-        def handler(ev):
-            pos = self.view.mapToScene(ev.position().toPoint())
-            for bf in self.controller.blocks.values():
-                if bf.isVisible() and bf.mapRectToScene(bf.rect()).contains(
-                        pos):
-                    self._controller_add_block_pin_at_point(bf, pos)
-                    self.view.viewport().removeEventFilter(filter_obj)
-                    return True
-            return False
-
-        class OneShot(QObject):
-            def eventFilter(self, obj, ev):
-                if ev.type() == 2: return handler(ev)
-                return False
-
-        filter_obj = OneShot()
-        self.view.viewport().installEventFilter(filter_obj)
+    def _handle_pin_click(self, ev) -> bool:
+        pos = ev.scenePos()
+        for bf in self.scene.items(pos):
+            if isinstance(bf, BlockFrame):
+                self._controller_add_block_pin_at_point(bf, pos)
+                self._deactivate_mode()
+                return True
+        return False
 
     def _controller_add_block_pin_at_point(self, block_frame: BlockFrame,
                                            scene_pos: QPointF):
         local = block_frame.mapFromScene(scene_pos)
         rect = block_frame.rect()
-        lx = min(max(local.x(), 0.0), rect.width())
-        ly = min(max(local.y(), 0.0), rect.height())
-        left = lx
-        right = rect.width() - lx
-        top = ly
-        bottom = rect.height() - ly
-        m = min(left, right, top, bottom)
-        if m == left:
-            nx, ny = 0.0, ly
-        elif m == right:
-            nx, ny = rect.width(), ly
-        elif m == top:
-            nx, ny = lx, 0.0
-        else:
-            nx, ny = lx, rect.height()
-        relx = nx / rect.width() if rect.width() else 0.0
-        rely = ny / rect.height() if rect.height() else 0.0
+        w, h = rect.width(), rect.height()
+        nx, ny = snap_to_rect_edge(local.x(), local.y(), w, h)
+        relx = nx / w if w else 0.0
+        rely = ny / h if h else 0.0
         block_frame.add_block_pin(name=None, relx=relx, rely=rely)
         self.controller.show_only_block(self._current_block_id)
 
+    @pyqtSlot()
     def _on_add_wire(self):
         if self.active_mode == 'wire':
             self._deactivate_mode()
             return
 
         self._deactivate_mode()
-        self.active_mode = 'wire'
+        self._set_mode('wire')
         self.controller.set_add_wire_mode(True)
 
         QMessageBox.information(self, "Add Wire",
                                 "Click a pin/junction to start, then click another pin/junction to complete the wire. Click 'Add Wire' again to cancel.")
 
-        def handler(ev):
-            if ev.button() != Qt.MouseButton.LeftButton:
-                return False
-
-            pos = self.view.mapToScene(ev.position().toPoint())
-            items = self.scene.items(pos)
-
-            item = None
-            for it in items:
-                if isinstance(it, (PortItem, JunctionItem)):
-                    item = it
-                    break
-
-            if item is None:
-                return False
-
-            if self.controller.temp_wire_start is None:
-                self.controller.start_wire(item)
-                return True
-            else:
-                self.controller.finish_wire(item)
-                # after finish we want to exit the mode automatically:
-                self._deactivate_mode()
-                return True
+    def _handle_wire_click(self, ev) -> bool:
+        if ev.button() != Qt.MouseButton.LeftButton:
+            return False
 
-        class WireModeFilter(QObject):
-            def eventFilter(self, obj, ev):
-                if ev.type() == 2:
-                    return handler(ev)
-                return False
+        item = self.scene.item_of_type_at(ev.scenePos(),
+                                          (PortItem, JunctionItem))
+        if item is None:
+            return False
 
-        self.current_filter = WireModeFilter()
-        self.view.viewport().installEventFilter(self.current_filter)
+        if self.controller.temp_wire_start is None:
+            self.controller.start_wire(item)
+        else:
+            self.controller.finish_wire(item)
+            # after finish we want to exit the mode automatically:
+            self._deactivate_mode()
+        return True
 
+    @pyqtSlot()
     def _on_add_junction(self):
         if self.active_mode == 'junction':
             self._deactivate_mode()
             return
 
         self._deactivate_mode()
-        self.active_mode = 'junction'
+        self._set_mode('junction')
         self.controller.set_add_junction_mode(True)
 
         QMessageBox.information(self, "Add Junction",
                                 "Click on an existing wire to add a junction. Click 'Add Junction' again to cancel.")
 
-        def handler(ev):
-            if ev.button() != Qt.MouseButton.LeftButton:
-                return False
-
-            pos = self.view.mapToScene(ev.position().toPoint())
-            items = self.scene.items(pos)
-
-            for it in items:
-                if isinstance(it, JunctionItem):
-                    return False
-
-            wire_item = None
-            for it in items:
-                if isinstance(it, WireItem):
-                    wire_item = it
-                    break
-
-            if wire_item is not None:
-                self.controller.create_junction_at(pos, wire_item)
-                self._deactivate_mode()
-                return True
-
+    def _handle_junction_click(self, ev) -> bool:
+        if ev.button() != Qt.MouseButton.LeftButton:
             return False
 
-        class JunctionModeFilter(QObject):
-            def eventFilter(self, obj, ev):
-                if ev.type() == 2:
-                    result = handler(ev)
-                    if result:
-                        ev.accept()
-                        return True
-                    return False
+        pos = ev.scenePos()
+        wire_item = None
+        for it in self.scene.items(pos):
+            if isinstance(it, JunctionItem):
                 return False
+            if wire_item is None and isinstance(it, WireItem):
+                wire_item = it
+        if wire_item is None:
+            wire_item = self.controller.nearest_wire_at(pos)
+
+        if wire_item is not None:
+            self.controller.create_junction_at(pos, wire_item)
+            self._deactivate_mode()
+            return True
 
-        self.current_filter = JunctionModeFilter()
-        self.view.viewport().installEventFilter(self.current_filter)
+        return False
 
+    @pyqtSlot()
     def _on_delete_selected(self):
         self._deactivate_mode()
         selected = list(self.scene.selectedItems())
         if not selected:
             QMessageBox.information(self, "Delete", "No selection.")
             return
-        blocks = [it for it in selected if isinstance(it, BlockFrame)]
-        instances = [it for it in selected if isinstance(it, InstanceItem)]
-        ports = [it for it in selected if isinstance(it, PortItem)]
-        wires = [it for it in selected if isinstance(it, WireItem)]
-        junctions = [it for it in selected if isinstance(it, JunctionItem)]
-        for b in blocks: self.controller.delete_block(b)
-        for inst in instances: self.controller.delete_instance(inst)
-        for p in ports:
-            if p.owner_id and p.owner_id.startswith("block:"):
-                self.controller.delete_block_pin(p)
-            else:
-                QMessageBox.information(self, "Delete pin",
-                                        "Only deletion of block-level pins is supported via toolbar.")
-        for w in wires: self.controller.delete_wire(w)
-        for j in junctions: self.controller.delete_junction(j)
-        QMessageBox.information(self, "Delete", "Selected items processed.")
+        buckets = {BlockFrame: [], InstanceItem: [], PortItem: [],
+                   WireItem: [], JunctionItem: []}
+        for it in selected:
+            lst = buckets.get(type(it))
+            if lst is not None:
+                lst.append(it)
+        self.view.setUpdatesEnabled(False)
+        self.scene.blockSignals(True)
+        try:
+            skipped = self.controller.delete_many(
+                buckets[BlockFrame], buckets[InstanceItem], buckets[PortItem],
+                buckets[WireItem], buckets[JunctionItem])
+        finally:
+            self.scene.blockSignals(False)
+            self.view.setUpdatesEnabled(True)
+            self.view.viewport().update()
         self._refresh_combo()
-        if self._current_block_id:
-            self.controller.show_only_block(self._current_block_id)
+        if skipped:
+            QMessageBox.information(self, "Delete pin",
+                                    "Only deletion of block-level pins is supported via toolbar.")
 
     def keyPressEvent(self, ev):
         if ev.key() == Qt.Key.Key_Escape:
@@ -1796,6 +2179,11 @@ class BlockEditor(QWidget):
         else:
             super().keyPressEvent(ev)
 
+    @pyqtSlot()
+    def _on_save(self):
+        self.controller.save_scene("scene_blocks.json")
+
+    @pyqtSlot()
     def _on_load_scene(self):
         self._deactivate_mode()
         self.controller.load_scene("scene_blocks.json")
@@ -1809,20 +2197,9 @@ def project_point_to_segment_local(p: QPointF, a: QPointF, b: QPointF) -> \
 Tuple[QPointF, float]:
     """Project point p onto segment a-b (all in same coordinate space).
        Returns (projected_point, t), where t in [0..1]"""
-    ax, ay = a.x(), a.y()
-    bx, by = b.x(), b.y()
-    px, py = p.x(), p.y()
-    vx = bx - ax
-    vy = by - ay
-    wx = px - ax
-    wy = py - ay
-    vlen2 = vx * vx + vy * vy
-    if vlen2 == 0:
-        return QPointF(ax, ay), 0.0
-    t = (wx * vx + wy * vy) / vlen2
-    t = max(0.0, min(1.0, t))
-    proj = QPointF(ax + t * vx, ay + t * vy)
-    return proj, t
+    qx, qy, t = project_xy_to_segment(p.x(), p.y(), a.x(), a.y(),
+                                      b.x(), b.y())
+    return QPointF(qx, qy), t
 
 
 if __name__ == "__main__":
@@ -4,6 +4,8 @@ from typing import Dict, List, Optional
 
 
 class Instance:
+    __slots__ = ("__type", "__name", "__parent", "__interface_pins")
+
     def __init__(self, name: str, type: "Block",  parent: "Block" = None):
         self.__type = type
         self.__name = name
@@ -49,6 +51,9 @@ class Instance:
         
 
 class Block:
+    __slots__ = ("__name", "__instances", "__interface_pins",
+                 "__interface_pins_refs", "__nets", "__is_primitive")
+
     def __init__(self, name: str, is_primitive: bool = False, primitive_pins: List[str] = []):
         self.__name = name
         self.__instances: dict[str, Instance] = {}
@@ -174,6 +179,8 @@ class Block:
 
 
 class Pin:
+    __slots__ = ("__name", "__owner")
+
     def __init__(self, name : str, parent: Optional[object] = None):
         self.__name: str = name
         self.__owner: Optional[object] = parent
@@ -192,6 +199,8 @@ class Pin:
 
 
 class PinRef:
+    __slots__ = ("__pin", "__net", "__parent")
+
     def __init__(self, pin: Pin, parent: Optional[object] = None):
         self.__pin = pin
         self.__net: Optional[Net] = None
@@ -221,6 +230,8 @@ class PinRef:
 
 
 class Net:
+    __slots__ = ("__name", "__pins", "__parent")
+
     def __init__(self, name: str, parent: Block):
         self.__name = name
         self.__pins: list[PinRef] = []
@@ -1,11 +1,16 @@
-import subprocess
+import os
+from functools import lru_cache
 
 from PyQt6 import QtCore, QtWidgets
 
 from ui.welcome_window_ui import WelcomeWindowUI
-from ui.checker_ui import CheckerDialog
-from editor import Editor
-from checker.src.checker import FileChecker
+
+
+@lru_cache(maxsize=8)
+def _check_file_cached(file_name, mtime_ns):
+    """Run the checker once per (file, modification time)."""
+    from checker.src.checker import FileChecker
+    return FileChecker(file_name).check()
 
 
 class Shell(WelcomeWindowUI):
@@ -18,6 +23,8 @@ class Shell(WelcomeWindowUI):
 
     def run_editor(self):
         """Launch the editor window and close shell."""
+        # imported on first use: pulls in the whole graphics stack
+        from editor import Editor
         if self.editor_window is None or not self.editor_window.isVisible():
             self.editor_window = Editor()
         else:
@@ -29,17 +36,18 @@ class Shell(WelcomeWindowUI):
     @staticmethod
     def run_checker(file_name):
         try:
-            checker = FileChecker(file_name)
-            report = checker.check()
-            
+            report = _check_file_cached(file_name,
+                                        os.stat(file_name).st_mtime_ns)
+
             print("Отчёт чекера:")
             print(report)
         except FileNotFoundError:
-            print("Ошибка: приложение 'check_file' не найдено в PATH.")
+            print(f"Ошибка: файл '{file_name}' не найден.")
         except Exception as e:
             print(f"Ошибка при запуске: {e}")
 
     def checker_init(self):
+        from ui.checker_ui import CheckerDialog
         dialog = CheckerDialog()
 
         try:
@@ -48,18 +56,10 @@ class Shell(WelcomeWindowUI):
             pass
 
         def browse_wrapper():
-            file_path, _ = QtWidgets.QFileDialog.getOpenFileName(
-                dialog,
-                "Выберите входной файл",
-                "",
-                "Текстовые файлы (*.net);;Все файлы (*)",
-            )
+            file_path = dialog.browse_file()
             if file_path:
-                dialog.selected_file = file_path
                 print(f"Выбран файл: {file_path}")
             else:
-                if hasattr(dialog, "selected_file"):
-                    del dialog.selected_file
                 print("Файл не выбран (или пользователь отменил выбор).")
 
         dialog.browse_btn.clicked.connect(browse_wrapper)
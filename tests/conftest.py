@@ -1,7 +1,14 @@
+import os
 import sys
 import pytest
+
+# must be set before any QtWidgets import
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
 from PyQt6.QtWidgets import QApplication
 
+TEST_FILES_DIR = os.path.join(os.path.dirname(__file__), '..', 'test_files')
+
 # ...existing code...
 
 @pytest.fixture(scope="session", autouse=True)
@@ -9,4 +16,39 @@ def qapp():
     app = QApplication.instance()
     if not app:
         app = QApplication(sys.argv)
-    return app
\ No newline at end of file
+    yield app
+    # drain deferred deletes before interpreter shutdown
+    app.closeAllWindows()
+    app.processEvents()
+
+@pytest.fixture
+def scene_ctrl(qapp):
+    from PyQt6.QtWidgets import QGraphicsScene
+    from editor.graphical import Controller
+    scene = QGraphicsScene()
+    return scene, Controller(scene)
+
+
+@pytest.fixture
+def two_instances_wired(scene_ctrl):
+    """Parent block with instances of C1 and C2 joined by one wire."""
+    from PyQt6.QtCore import QPointF
+    scene, ctrl = scene_ctrl
+    c1 = ctrl.add_block("C1"); c2 = ctrl.add_block("C2")
+    c1.add_block_pin(name="p", relx=0.0, rely=0.5); c2.add_block_pin(name="p", relx=1.0, rely=0.5)
+    parent = ctrl.add_block("Parent")
+    i1 = parent.add_instance(c1, QPointF(10, 10)); i2 = parent.add_instance(c2, QPointF(150, 10))
+    ctrl.show_only_block(parent.model.id)
+    pi1 = i1.port_items["p"]; pi2 = i2.port_items["p"]
+    ctrl.set_add_wire_mode(True); ctrl.start_wire(pi1)
+    wi = ctrl.finish_wire(pi2)
+    return ctrl, parent, i1, i2, pi1, pi2, wi
+
+
+@pytest.fixture(scope="session")
+def valid_checker():
+    """FileChecker for test_file_1.net, parsed once per session."""
+    from checker.src.checker import FileChecker
+    file_path = os.path.join(TEST_FILES_DIR, 'test_file_1.net')
+    assert os.path.exists(file_path), f"Test file not found: {file_path}"
+    return FileChecker(file_path)
@@ -11,15 +11,20 @@ ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
-from PyQt6.QtWidgets import QGraphicsScene, QMessageBox
-from PyQt6.QtCore import QPointF
+from PyQt6.QtWidgets import QGraphicsScene, QGraphicsView, QMessageBox
+from PyQt6.QtCore import QPointF, Qt
+from PyQt6.QtTest import QTest
+
+from editor.graphical import Controller, EditorScene, PortItem, BlockModel, WireModel, PortModel, project_point_to_segment, project_point_to_segment_local, project_xy_to_segment, project_xy_to_segments, snap_to_rect_edge
+
+
+def _midpoint(a, b):
+    return (a + b) / 2
 
-from editor.graphical import Controller, project_point_to_segment, project_point_to_segment_local
 
 # Добавление двух блоков и показ одного
-def test_add_block_and_show():
-    scene = QGraphicsScene()
-    ctrl = Controller(scene)
+def test_add_block_and_show(scene_ctrl):
+    scene, ctrl = scene_ctrl
     bf1 = ctrl.add_block("A")
     bf2 = ctrl.add_block("B")
     assert len(ctrl.blocks) == 2
@@ -29,9 +34,8 @@ def test_add_block_and_show():
     assert bf2.isVisible() is False
 
 # Добавление pin в блок и проверка, что инстансы получают этот pin
-def test_add_block_pin_propagates_to_instances():
-    scene = QGraphicsScene()
-    ctrl = Controller(scene)
+def test_add_block_pin_propagates_to_instances(scene_ctrl):
+    scene, ctrl = scene_ctrl
     child = ctrl.add_block("Child")
     parent = ctrl.add_block("Parent")
     parent.add_instance(child, QPointF(10, 10))
@@ -43,35 +47,15 @@ def test_add_block_pin_propagates_to_instances():
     assert "PIN1" in inst_vis.port_items
 
 # Создание цепи между пинами двух инстансов внутри одного блока
-def test_create_simple_wire_between_instances():
-    scene = QGraphicsScene()
-    ctrl = Controller(scene)
-    c1 = ctrl.add_block("C1"); c2 = ctrl.add_block("C2")
-    c1.add_block_pin(name="p", relx=0.0, rely=0.5)
-    c2.add_block_pin(name="p", relx=1.0, rely=0.5)
-    parent = ctrl.add_block("Parent")
-    i1 = parent.add_instance(c1, QPointF(10, 10)); i2 = parent.add_instance(c2, QPointF(150, 10))
-    ctrl.show_only_block(parent.model.id)
-    pi1 = i1.port_items.get("p"); pi2 = i2.port_items.get("p")
-    assert pi1 is not None and pi2 is not None
-    ctrl.set_add_wire_mode(True); ctrl.start_wire(pi1)
-    wi = ctrl.finish_wire(pi2)
+def test_create_simple_wire_between_instances(two_instances_wired):
+    ctrl, parent, i1, i2, pi1, pi2, wi = two_instances_wired
     assert wi is not None
     assert any(w.id == wi.model.id for w in parent.model.wires)
     assert wi.model.id in ctrl.current_wire_items
 
 # Удаление цепи
-def test_delete_wire_simple():
-    scene = QGraphicsScene()
-    ctrl = Controller(scene)
-    c1 = ctrl.add_block("C1"); c2 = ctrl.add_block("C2")
-    c1.add_block_pin(name="p", relx=0.0, rely=0.5); c2.add_block_pin(name="p", relx=1.0, rely=0.5)
-    parent = ctrl.add_block("Parent")
-    i1 = parent.add_instance(c1, QPointF(10, 10)); i2 = parent.add_instance(c2, QPointF(150, 10))
-    ctrl.show_only_block(parent.model.id)
-    pi1 = i1.port_items.get("p"); pi2 = i2.port_items.get("p")
-    ctrl.set_add_wire_mode(True); ctrl.start_wire(pi1)
-    wi = ctrl.finish_wire(pi2)
+def test_delete_wire_simple(two_instances_wired):
+    ctrl, parent, i1, i2, pi1, pi2, wi = two_instances_wired
     assert wi is not None
     wid = wi.model.id
     ctrl.delete_wire(wi)
@@ -79,20 +63,11 @@ def test_delete_wire_simple():
     assert wid not in ctrl.current_wire_items
 
 # Создание и удаление пересечения в цепе
-def test_create_and_delete_junction_simple():
-    scene = QGraphicsScene()
-    ctrl = Controller(scene)
-    c1 = ctrl.add_block("C1"); c2 = ctrl.add_block("C2")
-    c1.add_block_pin(name="p", relx=0.0, rely=0.5); c2.add_block_pin(name="p", relx=1.0, rely=0.5)
-    parent = ctrl.add_block("Parent")
-    i1 = parent.add_instance(c1, QPointF(10,10)); i2 = parent.add_instance(c2, QPointF(150,10))
-    ctrl.show_only_block(parent.model.id)
-    pi1 = i1.port_items.get("p"); pi2 = i2.port_items.get("p")
-    ctrl.set_add_wire_mode(True); ctrl.start_wire(pi1)
-    wi = ctrl.finish_wire(pi2)
+def test_create_and_delete_junction_simple(two_instances_wired):
+    ctrl, parent, i1, i2, pi1, pi2, wi = two_instances_wired
     assert wi is not None
     a = wi.start_obj.scenePos(); b = wi.end_obj.scenePos()
-    mid = QPointF((a.x()+b.x())/2, (a.y()+b.y())/2)
+    mid = _midpoint(a, b)
     ji = ctrl.create_junction_at(mid, wi)
     assert ji is not None
     assert any(j.id == ji.model.id for j in parent.model.junctions)
@@ -102,9 +77,8 @@ def test_create_and_delete_junction_simple():
     assert ji.model.id not in ctrl.current_junction_items
 
 # Копирование блока
-def test_copy_block_simple():
-    scene = QGraphicsScene()
-    ctrl = Controller(scene)
+def test_copy_block_simple(scene_ctrl):
+    scene, ctrl = scene_ctrl
     child = ctrl.add_block("Child")
     child.add_block_pin(name="pv", relx=0.0, rely=0.5)
     parent = ctrl.add_block("Parent")
@@ -115,9 +89,8 @@ def test_copy_block_simple():
     assert len(copied.model.instances) == len(parent.model.instances)
 
 # Копирование инстанса (упор на модель)
-def test_copy_instance_simple():
-    scene = QGraphicsScene()
-    ctrl = Controller(scene)
+def test_copy_instance_simple(scene_ctrl):
+    scene, ctrl = scene_ctrl
     child = ctrl.add_block("Child")
     child.add_block_pin(name="pv", relx=0.0, rely=0.5)
     parent = ctrl.add_block("Parent")
@@ -127,11 +100,11 @@ def test_copy_instance_simple():
     assert new_vis is not None
     assert len(parent.model.instances) == before + 1
     assert new_vis.model.id != inst_vis.model.id
+    assert new_vis.model.id in parent.instance_items
 
 # Проверка геттеров
-def test_getters_simple():
-    scene = QGraphicsScene()
-    ctrl = Controller(scene)
+def test_getters_simple(scene_ctrl):
+    scene, ctrl = scene_ctrl
     b = ctrl.add_block("B")
     b.add_block_pin(name="pv", relx=0.0, rely=0.5)
     inst = ctrl.add_block("Parent").add_instance(b, QPointF(5, 5))
@@ -143,9 +116,8 @@ def test_getters_simple():
     assert pm is not None and pm.name == "pv"
 
 # Простой тест: удаление блока с подтверждением
-def test_delete_block_confirmation_simple(monkeypatch):
-    scene = QGraphicsScene()
-    ctrl = Controller(scene)
+def test_delete_block_confirmation_simple(scene_ctrl, monkeypatch):
+    scene, ctrl = scene_ctrl
     bf = ctrl.add_block("ToDelete")
     bid = bf.model.id
     assert bid in ctrl.blocks
@@ -154,51 +126,9 @@ def test_delete_block_confirmation_simple(monkeypatch):
     ctrl.delete_block(bf)
     assert bid not in ctrl.blocks
 
-# Копирование инстанса (упор на графическое представление)
-def test_copy_instance_creates_new_visual_and_model():
-    scene = QGraphicsScene()
-    ctrl = Controller(scene)
-    child = ctrl.add_block("Child")
-    child.add_block_pin(name="pv", relx=0.0, rely=0.5)
-    parent = ctrl.add_block("Parent")
-    inst_vis = parent.add_instance(child, QPointF(10,10))
-    before_count = len(parent.model.instances)
-    new_inst_vis = ctrl.copy_instance(inst_vis, parent)
-    assert new_inst_vis is not None
-    assert len(parent.model.instances) == before_count + 1
-    assert new_inst_vis.model.id != inst_vis.model.id
-    assert new_inst_vis.model.id in parent.instance_items
-
-# Создание и удаление цепей
-def test_delete_wire_removes_model_and_visual():
-    scene = QGraphicsScene()
-    ctrl = Controller(scene)
-    c1 = ctrl.add_block("C1")
-    c2 = ctrl.add_block("C2")
-    c1.add_block_pin(name="p", relx=0.0, rely=0.5)
-    c2.add_block_pin(name="p", relx=1.0, rely=0.5)
-    parent = ctrl.add_block("Parent")
-    i1 = parent.add_instance(c1, QPointF(10,10))
-    i2 = parent.add_instance(c2, QPointF(150,10))
-    ctrl.show_only_block(parent.model.id)
-    p1 = i1.port_items.get("p")
-    p2 = i2.port_items.get("p")
-    ctrl.set_add_wire_mode(True)
-    ctrl.start_wire(p1)
-    wi = ctrl.finish_wire(p2)
-    assert wi is not None
-    wid = wi.model.id
-    assert any(w.id == wid for w in parent.model.wires)
-    assert wid in ctrl.current_wire_items
-
-    ctrl.delete_wire(wi)
-    assert not any(w.id == wid for w in parent.model.wires)
-    assert wid not in ctrl.current_wire_items
-
 # Добавление и удаление пина
-def test_delete_block_pin_removes_pin_and_visual():
-    scene = QGraphicsScene()
-    ctrl = Controller(scene)
+def test_delete_block_pin_removes_pin_and_visual(scene_ctrl):
+    scene, ctrl = scene_ctrl
     bf = ctrl.add_block("BlockX")
     pm = bf.add_block_pin(name="PX", relx=0.0, rely=0.5)
     assert any(p.name == "PX" for p in bf.model.ports)
@@ -209,25 +139,9 @@ def test_delete_block_pin_removes_pin_and_visual():
     assert not any(p.name == "PX" for p in bf.model.ports)
     assert "PX" not in bf.port_items
 
-# Удаление блока
-def test_delete_block_removes_block_after_confirmation(monkeypatch):
-    scene = QGraphicsScene()
-    ctrl = Controller(scene)
-    bf = ctrl.add_block("ToDelete")
-    bid = bf.model.id
-    assert bid in ctrl.blocks
-
-    monkeypatch.setattr("editor.graphical.QMessageBox.question",
-                        lambda *args, **kwargs: QMessageBox.StandardButton.Yes)
-    ctrl.delete_block(bf)
-    assert bid not in ctrl.blocks
-    assert not any(p.name == "PX" for p in bf.model.ports)
-    assert "PX" not in bf.port_items
-
 # Включение/выключение режима добавления пересечения
-def test_set_add_junction_mode_simple():
-    scene = QGraphicsScene()
-    ctrl = Controller(scene)
+def test_set_add_junction_mode_simple(scene_ctrl):
+    scene, ctrl = scene_ctrl
     assert ctrl.add_junction_mode is False
     ctrl.set_add_junction_mode(True)
     assert ctrl.add_junction_mode is True
@@ -235,17 +149,8 @@ def test_set_add_junction_mode_simple():
     assert ctrl.add_junction_mode is False
 
 # Удаление инстанса
-def test_delete_instance_simple():
-    scene = QGraphicsScene()
-    ctrl = Controller(scene)
-    c1 = ctrl.add_block("C1"); c2 = ctrl.add_block("C2")
-    c1.add_block_pin(name="p", relx=0.0, rely=0.5); c2.add_block_pin(name="p", relx=1.0, rely=0.5)
-    parent = ctrl.add_block("Parent")
-    i1 = parent.add_instance(c1, QPointF(10,10)); i2 = parent.add_instance(c2, QPointF(150,10))
-    ctrl.show_only_block(parent.model.id)
-    pi1 = i1.port_items.get("p"); pi2 = i2.port_items.get("p")
-    ctrl.set_add_wire_mode(True); ctrl.start_wire(pi1)
-    wi = ctrl.finish_wire(pi2)
+def test_delete_instance_simple(two_instances_wired):
+    ctrl, parent, i1, i2, pi1, pi2, wi = two_instances_wired
     assert wi is not None
     wid = wi.model.id
     ctrl.delete_instance(i1)
@@ -254,17 +159,8 @@ def test_delete_instance_simple():
     assert wid not in ctrl.current_wire_items
 
 # Перемещение пина
-def test_update_wires_for_pin_simple():
-    scene = QGraphicsScene()
-    ctrl = Controller(scene)
-    c1 = ctrl.add_block("C1"); c2 = ctrl.add_block("C2")
-    c1.add_block_pin(name="p", relx=0.0, rely=0.5); c2.add_block_pin(name="p", relx=1.0, rely=0.5)
-    parent = ctrl.add_block("Parent")
-    i1 = parent.add_instance(c1, QPointF(10,10)); i2 = parent.add_instance(c2, QPointF(150,10))
-    ctrl.show_only_block(parent.model.id)
-    pi1 = i1.port_items.get("p"); pi2 = i2.port_items.get("p")
-    ctrl.set_add_wire_mode(True); ctrl.start_wire(pi1)
-    wi = ctrl.finish_wire(pi2)
+def test_update_wires_for_pin_simple(two_instances_wired):
+    ctrl, parent, i1, i2, pi1, pi2, wi = two_instances_wired
     assert wi is not None
     before_mid = wi.path().pointAtPercent(0.5)
     pi1.model.x = 0.5
@@ -274,20 +170,11 @@ def test_update_wires_for_pin_simple():
     assert not (abs(before_mid.x() - after_mid.x()) < 1e-6 and abs(before_mid.y() - after_mid.y()) < 1e-6)
 
 # Создание цепи и пересечения, проверка обновления координат
-def test_update_wires_for_junction_simple():
-    scene = QGraphicsScene()
-    ctrl = Controller(scene)
-    c1 = ctrl.add_block("C1"); c2 = ctrl.add_block("C2")
-    c1.add_block_pin(name="p", relx=0.0, rely=0.5); c2.add_block_pin(name="p", relx=1.0, rely=0.5)
-    parent = ctrl.add_block("Parent")
-    i1 = parent.add_instance(c1, QPointF(10,10)); i2 = parent.add_instance(c2, QPointF(150,10))
-    ctrl.show_only_block(parent.model.id)
-    pi1 = i1.port_items.get("p"); pi2 = i2.port_items.get("p")
-    ctrl.set_add_wire_mode(True); ctrl.start_wire(pi1)
-    wi = ctrl.finish_wire(pi2)
+def test_update_wires_for_junction_simple(two_instances_wired):
+    ctrl, parent, i1, i2, pi1, pi2, wi = two_instances_wired
     assert wi is not None
     a = wi.start_obj.scenePos(); b = wi.end_obj.scenePos()
-    mid = QPointF((a.x()+b.x())/2, (a.y()+b.y())/2)
+    mid = _midpoint(a, b)
     ji = ctrl.create_junction_at(mid, wi)
     assert ji is not None
     before_mid = wi.path().pointAtPercent(0.5)
@@ -298,17 +185,8 @@ def test_update_wires_for_junction_simple():
     assert (abs(before_mid.x() - after_mid.x()) < 1e-6 or abs(before_mid.y() - after_mid.y()) < 1e-6)
 
 # Обновление цепей при перемещении инстанса
-def test_update_wires_for_instance_simple():
-    scene = QGraphicsScene()
-    ctrl = Controller(scene)
-    c1 = ctrl.add_block("C1"); c2 = ctrl.add_block("C2")
-    c1.add_block_pin(name="p", relx=0.0, rely=0.5); c2.add_block_pin(name="p", relx=1.0, rely=0.5)
-    parent = ctrl.add_block("Parent")
-    i1 = parent.add_instance(c1, QPointF(10,10)); i2 = parent.add_instance(c2, QPointF(150,10))
-    ctrl.show_only_block(parent.model.id)
-    pi1 = i1.port_items.get("p"); pi2 = i2.port_items.get("p")
-    ctrl.set_add_wire_mode(True); ctrl.start_wire(pi1)
-    wi = ctrl.finish_wire(pi2)
+def test_update_wires_for_instance_simple(two_instances_wired):
+    ctrl, parent, i1, i2, pi1, pi2, wi = two_instances_wired
     assert wi is not None
     before_mid = wi.path().pointAtPercent(0.5)
     i1.setPos(QPointF(i1.pos().x() + 20, i1.pos().y()))
@@ -317,18 +195,20 @@ def test_update_wires_for_instance_simple():
     after_mid = wi.path().pointAtPercent(0.5)
     assert not (abs(before_mid.x() - after_mid.x()) < 1e-6 and abs(before_mid.y() - after_mid.y()) < 1e-6)
 
+# Цепь без сдвига концов не перестраивает путь
+def test_wire_update_path_skips_unmoved_simple(two_instances_wired, monkeypatch):
+    ctrl, parent, i1, i2, pi1, pi2, wi = two_instances_wired
+    calls = []
+    monkeypatch.setattr(wi, "setPath", lambda path: calls.append(path))
+    wi.update_path()
+    assert calls == []
+    i1.setPos(QPointF(i1.pos().x() + 20, i1.pos().y()))
+    wi.update_path()
+    assert len(calls) == 1
+
 # Обновление цепей при перемещении блока
-def test_update_wires_for_block_move_simple():
-    scene = QGraphicsScene()
-    ctrl = Controller(scene)
-    c1 = ctrl.add_block("C1"); c2 = ctrl.add_block("C2")
-    c1.add_block_pin(name="p", relx=0.0, rely=0.5); c2.add_block_pin(name="p", relx=1.0, rely=0.5)
-    parent = ctrl.add_block("Parent")
-    i1 = parent.add_instance(c1, QPointF(10,10)); i2 = parent.add_instance(c2, QPointF(150,10))
-    ctrl.show_only_block(parent.model.id)
-    pi1 = i1.port_items.get("p"); pi2 = i2.port_items.get("p")
-    ctrl.set_add_wire_mode(True); ctrl.start_wire(pi1)
-    wi = ctrl.finish_wire(pi2)
+def test_update_wires_for_block_move_simple(two_instances_wired):
+    ctrl, parent, i1, i2, pi1, pi2, wi = two_instances_wired
     assert wi is not None
     before_mid = wi.path().pointAtPercent(0.5)
     ctrl.update_wires_for_block_move(parent, 10.0, 0.0)
@@ -351,11 +231,12 @@ def test_save_and_load_scene_simple(tmp_path):
     names1 = {bf.model.name for bf in ctrl1.blocks.values()}
     names2 = {bf.model.name for bf in ctrl2.blocks.values()}
     assert names1 == names2
+    # запись через временный файл: после сохранения он не остаётся рядом
+    assert [p.name for p in tmp_path.iterdir()] == ["scene_test.json"]
 
 # Проверка корректности поиска объектов по ID
-def test_find_object_by_id_tuple_simple():
-    scene = QGraphicsScene()
-    ctrl = Controller(scene)
+def test_find_object_by_id_tuple_simple(scene_ctrl):
+    scene, ctrl = scene_ctrl
     child = ctrl.add_block("Child")
     child.add_block_pin(name="pv", relx=0.0, rely=0.5)
     parent = ctrl.add_block("Parent")
@@ -373,8 +254,151 @@ def test_find_object_by_id_tuple_simple():
     ctrl.set_add_wire_mode(True); ctrl.start_wire(pi1)
     wi = ctrl.finish_wire(pi2)
     a = wi.start_obj.scenePos(); b = wi.end_obj.scenePos()
-    ji = ctrl.create_junction_at((a + b) / 2, wi)
+    ji = ctrl.create_junction_at(_midpoint(a, b), wi)
     jid = ji.model.id
     found_j = ctrl.find_object_by_id_tuple((f"j:{jid}", ""))
     assert found_j is not None
 
+
+# Поиск ближайшего провода к точке клика
+def test_nearest_wire_at_simple(two_instances_wired):
+    ctrl, parent, i1, i2, pi1, pi2, wi = two_instances_wired
+    a = wi.start_obj.scenePos(); b = wi.end_obj.scenePos()
+    mid = _midpoint(a, b)
+    assert ctrl.nearest_wire_at(mid + QPointF(0, 3)) is wi
+    assert ctrl.nearest_wire_at(mid + QPointF(0, 50)) is None
+    hits = project_xy_to_segments(5.0, 5.0, [(0.0, 0.0, 10.0, 0.0), (0.0, 0.0, 0.0, 0.0)])
+    assert hits[0] == (5.0, 0.0, 0.5, 25.0)
+    assert hits[1] == (0.0, 0.0, 0.0, 50.0)
+
+# Пакетное удаление провода и инстанса
+def test_delete_many_simple(two_instances_wired):
+    ctrl, parent, i1, i2, pi1, pi2, wi = two_instances_wired
+    skipped = ctrl.delete_many(instances=[i1], ports=[pi1], wires=[wi])
+    assert skipped == [pi1]
+    assert len(parent.model.instances) == 1
+    assert parent.model.wires == []
+    assert ctrl._visible_block_id == parent.model.id
+
+# Индекс блоков по имени при добавлении, переименовании и удалении
+def test_blocks_by_name_simple(scene_ctrl, monkeypatch):
+    scene, ctrl = scene_ctrl
+    a = ctrl.add_block("A"); b = ctrl.add_block("B")
+    assert ctrl.blocks_by_name["A"] is a
+    ctrl.rename_block(a, "A2")
+    assert "A" not in ctrl.blocks_by_name and ctrl.blocks_by_name["A2"] is a
+    assert a.title.text() == "A2"
+    monkeypatch.setattr(QMessageBox, "question", lambda *a, **k: QMessageBox.StandardButton.Yes)
+    ctrl.delete_block(b)
+    assert "B" not in ctrl.blocks_by_name
+
+# Привязка точки к ближайшей стороне блока
+def test_snap_to_rect_edge_simple():
+    assert snap_to_rect_edge(2.0, 50.0, 100.0, 80.0) == (0.0, 50.0)
+    assert snap_to_rect_edge(95.0, 40.0, 100.0, 80.0) == (100.0, 40.0)
+    assert snap_to_rect_edge(50.0, 1.0, 100.0, 80.0) == (50.0, 0.0)
+    assert snap_to_rect_edge(50.0, 200.0, 100.0, 80.0) == (50.0, 80.0)
+    assert snap_to_rect_edge(0.0, 0.0, 100.0, 80.0) == (0.0, 0.0)
+
+# Поиск элемента нужного типа под курсором
+def test_item_of_type_at_simple():
+    scene = EditorScene()
+    ctrl = Controller(scene)
+    child = ctrl.add_block("C"); child.add_block_pin(name="p", relx=0.0, rely=0.5)
+    parent = ctrl.add_block("Parent")
+    inst = parent.add_instance(child, QPointF(10, 10))
+    ctrl.show_only_block(parent.model.id)
+    pi = inst.port_items.get("p")
+    assert scene.item_of_type_at(pi.scenePos(), PortItem) is pi
+    assert scene.item_of_type_at(QPointF(-500, -500), PortItem) is None
+
+# Клики уходят обработчику активного режима сцены
+def test_scene_set_mode_routes_clicks_simple():
+    scene = EditorScene()
+    view = QGraphicsView(scene)
+    clicks = []
+    scene.set_mode_handler("pin", lambda ev: clicks.append(ev.scenePos()) or True)
+    QTest.mouseClick(view.viewport(), Qt.MouseButton.LeftButton)
+    assert clicks == []
+    scene.set_mode("pin")
+    QTest.mouseClick(view.viewport(), Qt.MouseButton.LeftButton)
+    assert len(clicks) == 1
+    scene.set_mode(None)
+    QTest.mouseClick(view.viewport(), Qt.MouseButton.LeftButton)
+    assert len(clicks) == 1
+
+# Отложенное обновление проводов внутри batch()
+def test_batch_defers_wire_refresh(two_instances_wired):
+    ctrl, parent, i1, i2, pi1, pi2, wi = two_instances_wired
+    before_mid = wi.path().pointAtPercent(0.5)
+    with ctrl.batch():
+        i1.setPos(QPointF(i1.pos().x() + 20, i1.pos().y()))
+        ctrl.update_wires_for_instance(i1)
+        assert wi.path().pointAtPercent(0.5) == before_mid
+        assert wi.model.id in ctrl._dirty_wires
+    assert ctrl._dirty_wires == {}
+    assert wi.path().pointAtPercent(0.5) != before_mid
+
+# Поиск объектов по виду и ID без разбора строк
+def test_find_object_by_kind_simple(two_instances_wired):
+    ctrl, parent, i1, i2, pi1, pi2, wi = two_instances_wired
+    child_id = ctrl.blocks_by_name["C1"].model.id
+    assert ctrl.find_object("block", child_id, "p") is ctrl.blocks[child_id].port_items["p"]
+    assert ctrl.find_object("instance", i1.model.id, "p") is pi1
+    assert ctrl.find_object("instance", i1.model.id, "missing") is None
+    ji = ctrl.create_junction_at(_midpoint(pi1.scenePos(), pi2.scenePos()), wi)
+    assert ctrl.find_object("junction", ji.model.id) is ji
+    assert ctrl.find_object_by_id_tuple(("block", child_id, "p")) is ctrl.blocks[child_id].port_items["p"]
+    assert ctrl.find_object_by_id_tuple((f"j:{ji.model.id}", "")) is ji
+
+# Индексы модели блока по ID остаются актуальными при изменении списков
+def test_block_model_indexes_simple():
+    bm = BlockModel(name="B")
+    w1 = WireModel(); w2 = WireModel()
+    bm.wires.append(w1)
+    assert bm.wires_by_id == {w1.id: w1}
+    bm.wires.remove(w1); bm.wires.append(w2)
+    assert bm.wires_by_id == {w2.id: w2}
+    bm.wires = [w for w in bm.wires if w.id != w2.id]
+    assert bm.wires_by_id == {}
+    bm.ports.append(PortModel("p", 0.0, 0.5))
+    assert "p" in bm.ports_by_name
+    assert BlockModel.from_dict(bm.to_dict()).ports_by_name.keys() == {"p"}
+    bm.rename_port(bm.ports[0], "q")
+    assert bm.ports_by_name.keys() == {"q"}
+
+# Индексы сбрасываются и после += / *= над списком модели
+def test_block_model_indexes_inplace_ops_simple():
+    bm = BlockModel(name="B")
+    w1 = WireModel()
+    assert bm.wires_by_id == {}
+    wires = bm.wires
+    bm.wires += [w1]
+    assert bm.wires is wires
+    assert bm.wires_by_id == {w1.id: w1}
+    bm.wires *= 0
+    assert bm.wires is wires
+    assert bm.wires_by_id == {}
+
+# Пересечения остаются на своей цепи после перемещения блока
+def test_block_move_reprojects_junctions_simple(two_instances_wired):
+    ctrl, parent, i1, i2, pi1, pi2, wi = two_instances_wired
+    ji = ctrl.create_junction_at(_midpoint(pi1.scenePos(), pi2.scenePos()), wi)
+    i2.setPos(QPointF(i2.pos().x(), i2.pos().y() + 40))
+    ctrl.update_wires_for_block_move(parent, 0.0, 0.0)
+    a, b = pi1.scenePos(), pi2.scenePos()
+    qx, qy, t = project_xy_to_segment(ji.model.x, ji.model.y, a.x(), a.y(), b.x(), b.y())
+    assert abs(qx - ji.model.x) < 1e-6 and abs(qy - ji.model.y) < 1e-6
+    assert ji.pos() == QPointF(ji.model.x, ji.model.y)
+
+# Восстановление сцены из сериализованных байтов без файла
+def test_load_scene_from_bytes_simple(scene_ctrl):
+    scene, ctrl = scene_ctrl
+    b = ctrl.add_block("Bytes")
+    b.add_block_pin(name="p1", relx=0.0, rely=0.5)
+    ctrl2 = Controller(QGraphicsScene())
+    ctrl2.load_scene_from_bytes(ctrl.serialize_scene())
+    assert [bf.model.name for bf in ctrl2.blocks.values()] == ["Bytes"]
+    assert ctrl2.serialize_scene() == ctrl.serialize_scene()
+    compact = ctrl.serialize_scene(compact=True)
+    assert b"\n" not in compact and len(compact) < len(ctrl.serialize_scene())
@@ -6,19 +6,13 @@ from netlist_model import NetlistProject
 
 TEST_FILES_DIR = os.path.join(os.path.dirname(__file__), '..', 'test_files')
 
-def test_checker_parser_integration_valid_file():
+def test_checker_parser_integration_valid_file(valid_checker):
     """
     Test that FileChecker can successfully load a valid netlist file using the Parser
     and run checks on it.
     """
-    file_path = os.path.join(TEST_FILES_DIR, 'test_file_1.net')
-    
-    # Ensure file exists
-    assert os.path.exists(file_path), f"Test file not found: {file_path}"
-    
-    # Initialize FileChecker
-    # This triggers loading the file via Parser
-    checker = FileChecker(file_path)
+    # Loaded once per session via the Parser (see conftest.valid_checker)
+    checker = valid_checker
     
     # Check if object model is loaded correctly
     netlist = checker.get_object_model()
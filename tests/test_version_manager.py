@@ -0,0 +1,365 @@
+"""
+Тесты для editor.version_manager.VersionManager (история хранится в git во временной папке)
+"""
+
+import sys
+import os
+import gc
+import json
+import threading
+import subprocess
+import pytest
+
+# ensure project root is importable
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from editor.version_manager import VersionManager
+
+
+class FakeController:
+    """Минимальный controller: сцена — просто словарь с блоками."""
+
+    def __init__(self):
+        self.data = {"blocks": []}
+
+    def add_block(self, name):
+        self.data["blocks"].append({"name": name, "instances": []})
+
+    def serialize_scene(self, compact=False):
+        if compact:
+            return json.dumps(self.data, separators=(",", ":")).encode("utf-8")
+        return json.dumps(self.data, indent=2).encode("utf-8")
+
+    def save_scene(self, filename):
+        with open(filename, "wb") as f:
+            f.write(self.serialize_scene())
+
+    def load_scene(self, filename):
+        with open(filename, "rb") as f:
+            self.load_scene_from_bytes(f.read())
+
+    def load_scene_from_bytes(self, data):
+        self.data = json.loads(data)
+
+
+@pytest.fixture
+def vm(tmp_path, monkeypatch):
+    base = tmp_path / ".editor_history"
+    monkeypatch.setattr(VersionManager, "HISTORY_BASE_DIR", str(base))
+    monkeypatch.setattr(VersionManager, "MAPPING_FILE", str(base / "file_mapping.json"))
+    # по умолчанию каждое сохранение — отдельный коммит
+    monkeypatch.setattr(VersionManager, "COALESCE_MS", 0)
+    return VersionManager(None, FakeController())
+
+
+def _names(controller):
+    return [b["name"] for b in controller.data["blocks"]]
+
+
+def _git_head(vm):
+    return subprocess.run(["git", "-C", vm.git_dir, "rev-parse", "HEAD"],
+                          capture_output=True, text=True, check=True).stdout.strip()
+
+# Текущий коммит читается без git и совпадает с HEAD
+def test_current_commit_matches_head_simple(vm):
+    assert vm.current_commit == _git_head(vm)
+    vm.controller.add_block("A")
+    vm.save_state("Add A")
+    vm.flush()
+    assert vm.current_commit == _git_head(vm)
+    assert vm._read_head() == vm.current_commit
+    assert len(vm.current_commit) == 40
+
+# Откат и возврат действий
+def test_undo_redo_simple(vm):
+    ctrl = vm.controller
+    ctrl.add_block("A"); vm.save_state("Add A")
+    ctrl.add_block("B"); vm.save_state("Add B")
+    assert vm.undo()
+    assert _names(ctrl) == ["A"]
+    assert vm.undo()
+    assert _names(ctrl) == []
+    assert not vm.undo()
+    assert vm.redo()
+    assert _names(ctrl) == ["A"]
+    assert vm.redo()
+    assert _names(ctrl) == ["A", "B"]
+    assert not vm.redo()
+
+# История действий в обратном порядке
+def test_get_history_simple(vm):
+    vm.controller.add_block("A"); vm.save_state("Add A")
+    history = vm.get_history()
+    assert history[0]["action"].startswith("Add A")
+    assert history[-1]["action"] == "Initial commit"
+    assert len(history[0]["commit"]) == 7
+
+# Чтение состояния из коммита без checkout
+def test_read_blob_simple(vm):
+    vm.controller.add_block("A"); vm.save_state("Add A")
+    vm.flush()
+    data = vm._read_blob(vm.current_commit)
+    assert [b["name"] for b in json.loads(data)["blocks"]] == ["A"]
+    with pytest.raises(RuntimeError):
+        vm._read_blob("0" * 40)
+    # процесс cat-file продолжает отвечать после ошибки
+    assert json.loads(vm._read_blob(vm._get_initial_commit())) == {"blocks": []}
+
+# История кешируется до следующего сохранения
+def test_history_cache_simple(vm):
+    first = vm._get_commit_history()
+    assert vm._get_commit_history() is first
+    vm.controller.add_block("A"); vm.save_state("Add A")
+    assert len(vm._get_commit_history()) == len(first) + 1
+
+# Быстрые сохранения подряд дают отдельные коммиты со своим состоянием
+def test_save_state_in_background_simple(vm):
+    ctrl = vm.controller
+    for name in ("A", "B", "C"):
+        ctrl.add_block(name); vm.save_state(f"Add {name}")
+    assert [h["action"][:5] for h in vm.get_history()[:3]] == ["Add C", "Add B", "Add A"]
+    assert vm.undo()
+    assert _names(ctrl) == ["A", "B"]
+
+# Сообщения с разделителями не ломают разбор истории
+def test_history_message_with_separators_simple(vm):
+    vm.controller.add_block("A"); vm.save_state("Rename a|b")
+    assert vm.get_history()[0]["action"].startswith("Rename a|b - ")
+
+# Сохранение без изменений сцены не создаёт коммит
+def test_unchanged_state_skips_commit_simple(vm):
+    ctrl = vm.controller
+    ctrl.add_block("A"); vm.save_state("Add A")
+    vm.save_state("Select A")
+    assert [h["action"][:5] for h in vm.get_history()[:2]] == ["Add A", "Initi"]
+    # после отката сравнение идёт с загруженным состоянием
+    assert vm.undo()
+    undone = vm.current_commit
+    vm.save_state("Select nothing")
+    vm.flush()
+    assert vm.current_commit == undone
+    ctrl.add_block("B"); vm.save_state("Add B")
+    assert vm.get_history()[0]["action"].startswith("Add B")
+
+# Глубина отката ограничена MAX_UNDO
+def test_undo_depth_is_bounded_simple(vm, monkeypatch):
+    monkeypatch.setattr(VersionManager, "MAX_UNDO", 2)
+    ctrl = vm.controller
+    for name in ("A", "B", "C"):
+        ctrl.add_block(name); vm.save_state(f"Add {name}")
+    assert len(vm.get_history()) == 3
+    assert vm.undo() and vm.undo()
+    assert not vm.undo()
+    assert _names(ctrl) == ["A"]
+
+# Недавние состояния берутся из памяти, старые — из git
+def test_undo_uses_snapshot_cache_simple(vm, monkeypatch):
+    ctrl = vm.controller
+    ctrl.add_block("A"); vm.save_state("Add A")
+    ctrl.add_block("B"); vm.save_state("Add B")
+    vm.flush()
+    # начальное состояние прогрето при запуске; вытесняем его, чтобы проверить чтение из git
+    vm._snapshots.pop(vm._get_initial_commit())
+    reads = []
+    real_read_blob = vm._read_blob
+    monkeypatch.setattr(vm, "_read_blob", lambda c: reads.append(c) or real_read_blob(c))
+    assert vm.undo() and _names(ctrl) == ["A"]
+    assert reads == []
+    assert vm.undo() and _names(ctrl) == []
+    assert reads == [vm.current_commit]
+    assert vm.redo() and vm.redo()
+    assert _names(ctrl) == ["A", "B"] and len(reads) == 1
+
+# Сохранения внутри окна слияния дают один коммит
+def test_save_state_coalescing_simple(vm, monkeypatch):
+    monkeypatch.setattr(VersionManager, "COALESCE_MS", 10_000)
+    ctrl = vm.controller
+    for name in ("A", "B"):
+        ctrl.add_block(name); vm.save_state(f"Move {name}")
+    history = vm.get_history()
+    assert history[0]["action"].startswith("Move A - ")
+    assert "; Move B - " in history[0]["action"]
+    assert history[1]["action"] == "Initial commit"
+    assert vm.undo() and _names(ctrl) == []
+
+# Откат не трогает HEAD и рабочую копию репозитория
+def test_undo_leaves_repository_untouched_simple(vm):
+    vm.controller.add_block("A"); vm.save_state("Add A")
+    vm.flush()
+    head = _git_head(vm)
+    with open(vm.project_file, "rb") as f:
+        working_copy = f.read()
+    assert vm.undo()
+    assert _git_head(vm) == head
+    with open(vm.project_file, "rb") as f:
+        assert f.read() == working_copy
+
+# При запуске состояние HEAD загружается в фоне
+def test_warm_up_caches_head_simple(vm):
+    vm.flush()
+    assert vm.current_commit in vm._snapshots
+
+# Накопленные состояния коммитятся запущенным fast-import без новых процессов, но по коммиту на действие
+def test_commit_outbox_batches_simple(vm, monkeypatch):
+    vm.flush()
+    calls = []
+    real_git = vm._git
+    monkeypatch.setattr(vm, "_git", lambda *a, **kw: calls.append(a) or real_git(*a, **kw))
+    ctrl = vm.controller
+    for name in ("A", "B", "C"):
+        ctrl.add_block(name)
+        vm._outbox.append((ctrl.serialize_scene(compact=True), f"Add {name}"))
+    vm._commit_outbox()
+    assert calls == []
+    assert [h["action"] for h in vm.get_history()[:3]] == ["Add C", "Add B", "Add A"]
+    assert vm.current_commit == _git_head(vm)
+    assert vm.undo() and _names(ctrl) == ["A", "B"]
+
+# После сохранения история дополняется в памяти без повторного git log
+def test_history_extended_in_memory_simple(vm, monkeypatch):
+    vm._get_commit_history()
+    calls = []
+    real_git = vm._git
+    monkeypatch.setattr(vm, "_git", lambda *a, **kw: calls.append(a[0]) or real_git(*a, **kw))
+    vm.controller.add_block("A"); vm.save_state("Add A")
+    history = vm._get_commit_history()
+    assert "log" not in calls
+    assert history[0]["hash"] == vm.current_commit == _git_head(vm)
+    assert history[0]["message"].startswith("Add A")
+    # дата в том же строгом ISO 8601, что и %cI из git log
+    vm._history_cache = None
+    assert vm._get_commit_history()[0]["date"] == history[0]["date"]
+    assert vm.undo() and _names(vm.controller) == []
+
+# Начальный коммит и история не перечитываются из git при каждом откате
+def test_undo_redo_without_git_simple(vm, monkeypatch):
+    ctrl = vm.controller
+    ctrl.add_block("A"); vm.save_state("Add A")
+    ctrl.add_block("B"); vm.save_state("Add B")
+    assert vm.undo()
+    calls = []
+    real_git = vm._git
+    monkeypatch.setattr(vm, "_git", lambda *a, **kw: calls.append(a[0]) or real_git(*a, **kw))
+    assert vm.undo() and vm.redo() and vm.redo()
+    assert vm.undo() and _names(ctrl) == ["A"]
+    assert calls == []
+
+# Позиция в истории двигается вместе с откатом и возвратом
+def test_current_index_simple(vm):
+    ctrl = vm.controller
+    ctrl.add_block("A"); vm.save_state("Add A")
+    ctrl.add_block("B"); vm.save_state("Add B")
+    vm.flush()
+    assert vm.current_index == 0
+    vm.undo(); vm.undo()
+    assert vm.current_index == 2
+    vm.redo()
+    assert vm.current_index == 1
+    ctrl.add_block("C"); vm.save_state("Add C")
+    vm.flush()
+    assert vm.current_index == 0
+
+# Неизменённый внешний файл при повторном открытии не читается и не коммитится
+def test_external_file_stamp_simple(tmp_path, monkeypatch, vm):
+    path = tmp_path / "scheme.json"
+    ctrl = vm.controller
+    ctrl.add_block("A")
+    ctrl.save_scene(str(path))
+    # путь с .. указывает на тот же файл, что и path при сохранении
+    (tmp_path / "sub").mkdir()
+    vm2 = VersionManager(str(tmp_path / "sub" / ".." / "scheme.json"), ctrl)
+    assert [h["action"][:8] for h in vm2.get_history()[:2]] == ["External", "Initial "]
+    ctrl.add_block("B"); vm2.save_state("Add B", save_to_file=str(path))
+    vm2.flush()
+    reads = []
+    real_head_blob_id = VersionManager._head_blob_id
+    monkeypatch.setattr(VersionManager, "_head_blob_id",
+                        lambda self: reads.append(1) or real_head_blob_id(self))
+    vm3 = VersionManager(str(path), ctrl)
+    vm3.flush()
+    assert vm3.current_commit == vm2.current_commit and reads == []
+    # изменение файла снаружи снова фиксируется
+    ctrl.add_block("C"); ctrl.save_scene(str(path))
+    vm4 = VersionManager(str(path), ctrl)
+    assert vm4.get_history()[0]["action"].startswith("External")
+
+# Привязка к файлу с существующей историей коммитит его содержимое туда
+def test_associate_with_existing_repository_simple(tmp_path, vm):
+    path = tmp_path / "scheme.json"
+    ctrl = FakeController()
+    ctrl.add_block("A"); ctrl.save_scene(str(path))
+    other = VersionManager(str(path), FakeController())
+    other.flush()
+    ctrl.add_block("B"); ctrl.save_scene(str(path))
+    vm = VersionManager(None, ctrl)
+    vm.associate_with_file(str(path))
+    assert vm.repository_id == other.repository_id
+    assert vm.get_history()[0]["action"] == "Associated with file: scheme.json"
+    head = vm.current_commit
+    assert vm.undo() and _names(ctrl) == ["A"]
+    # файл совпадает с HEAD — повторная привязка нового коммита не создаёт
+    again = VersionManager(None, FakeController())
+    again.associate_with_file(str(path))
+    assert again.current_commit == head
+
+# Снимки в памяти хранятся сжатыми и отдаются без потерь
+def test_snapshots_are_compressed_simple(vm):
+    ctrl = vm.controller
+    for i in range(200):
+        ctrl.add_block(f"Block{i}")
+    vm.save_state("Add blocks")
+    vm.flush()
+    content = ctrl.serialize_scene(compact=True)
+    assert len(vm._snapshots[vm.current_commit]) < len(content) // 2
+    assert vm._state_at(vm.current_commit) == content
+
+# Упавший fast-import перезапускается при следующем коммите
+def test_fast_import_restarts_simple(vm):
+    vm.flush()
+    vm._fast_import().kill()
+    vm._importer.wait()
+    vm.controller.add_block("A"); vm.save_state("Add A")
+    vm.flush()
+    assert vm.current_commit == _git_head(vm)
+    assert vm.get_history()[0]["action"].startswith("Add A")
+
+# Маппинг файлов переживает перезапуск и не переписывается без изменений
+def test_mapping_roundtrip_simple(tmp_path, vm):
+    path = tmp_path / "scheme.json"
+    vm.associate_with_file(str(path))
+    mtime = os.stat(VersionManager.MAPPING_FILE).st_mtime_ns
+    vm.associate_with_file(str(path))
+    assert os.stat(VersionManager.MAPPING_FILE).st_mtime_ns == mtime
+    assert vm._load_mapping() == {os.path.normpath(str(path)): vm.repository_id}
+
+# Брошенный менеджер коммитит отложенное состояние и останавливает фоновый поток
+def test_dropped_manager_commits_pending_simple(vm, monkeypatch):
+    monkeypatch.setattr(VersionManager, "COALESCE_MS", 10_000)
+    # фикстуру держит pytest, поэтому нужен собственный экземпляр
+    before = set(threading.enumerate())
+    manager = VersionManager(None, FakeController())
+    manager.flush()
+    (worker,) = set(threading.enumerate()) - before
+    manager.controller.add_block("A"); manager.save_state("Add A")
+    git_dir = manager.git_dir
+    del manager
+    gc.collect()
+    worker.join(timeout=5)
+    assert not worker.is_alive()
+    log = subprocess.run(["git", "-C", git_dir, "log", "-1", "--format=%s"],
+                         capture_output=True, text=True, check=True).stdout
+    assert log.startswith("Add A")
+
+# Состояние, коммит которого не удался, можно сохранить повторно
+def test_failed_commit_is_retried_simple(vm):
+    vm.flush()
+    def broken_fast_import():
+        raise OSError("git is gone")
+    vm._fast_import = broken_fast_import
+    vm.controller.add_block("A"); vm.save_state("Add A")
+    vm.flush()
+    del vm._fast_import
+    vm.save_state("Add A again")
+    assert vm.get_history()[0]["action"].startswith("Add A again")
@@ -22,6 +22,13 @@ class CheckerDialog(QDialog):
         self.run_btn = QPushButton("Запуск Чекера")
         self.cancel_btn = QPushButton("Отмена")
 
+        # built once and reused on every "Обзор..." click
+        self._file_dialog = QFileDialog(self, "Выберите входной файл")
+        self._file_dialog.setFileMode(QFileDialog.FileMode.ExistingFile)
+        self._file_dialog.setNameFilters(
+            ["Текстовые файлы (*.net)", "Все файлы (*)"])
+        self.selected_file = None
+
         self.init_ui()
 
     def init_ui(self):
@@ -42,9 +49,13 @@ class CheckerDialog(QDialog):
         self.setLayout(self.layout)
 
     def browse_file(self):
-        file_path, _ = QFileDialog.getOpenFileName(
-            self, "Выберите входной файл", "", "Все файлы (*);;Текстовые файлы (*.txt)"
-        )
+        """Ask for an input file; stores and returns it, None if cancelled."""
+        if self._file_dialog.exec():
+            files = self._file_dialog.selectedFiles()
+            self.selected_file = files[0] if files else None
+        else:
+            self.selected_file = None
+        return self.selected_file
 
 
 if __name__ == "__main__":
@@ -11,12 +11,35 @@ from PyQt6.QtWidgets import (
     QLabel,
     QFrame,
     QSplitter,
+    QGraphicsView,
 )
 from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QAction
+from PyQt6.QtGui import QAction, QPainter
 
 
 class EditorWindowUI(QMainWindow):
+    # (attribute, label, grid row, grid column)
+    TOOLBAR_BUTTONS = (
+        ("add_block", "Add block", 1, 0),
+        ("add_instance", "Add instance", 1, 1),
+        ("add_pin", "Add pin", 1, 2),
+        ("add_net", "Add net", 1, 3),
+        ("add_junction", "Add junction", 1, 4),
+        ("btn_undo", "Undo", 1, 5),
+        ("del_block", "Delete block", 2, 0),
+        ("del_instance", "Delete instance", 2, 1),
+        ("del_pin", "Delete pin", 2, 2),
+        ("del_net", "Delete net", 2, 3),
+        ("del_junction", "Delete junction", 2, 4),
+        ("btn_redo", "Redo", 2, 5),
+        ("copy_block", "Copy block", 4, 0),
+        ("copy_instance", "Copy instance", 4, 1),
+        ("rename_block", "Rename block", 3, 0),
+        ("rename_instance", "Rename instance", 3, 1),
+        ("rename_pin", "Rename pin", 3, 2),
+        ("rename_net", "Rename net", 3, 3),
+    )
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Графический редактор")
@@ -59,49 +82,12 @@ class EditorWindowUI(QMainWindow):
         grid_layout = QGridLayout()
         grid_layout.setSpacing(5)
 
-        self.add_block = QPushButton("Add block")
-        self.add_instance = QPushButton("Add instance")
-        self.add_pin = QPushButton("Add pin")
-        self.add_net = QPushButton("Add net")
-        self.add_junction = QPushButton("Add junction")
-        self.btn_undo = QPushButton("Undo")
-
-        grid_layout.addWidget(self.add_block, 1, 0)
-        grid_layout.addWidget(self.add_instance, 1, 1)
-        grid_layout.addWidget(self.add_pin, 1, 2)
-        grid_layout.addWidget(self.add_net, 1, 3)
-        grid_layout.addWidget(self.add_junction, 1, 4)
-        grid_layout.addWidget(self.btn_undo, 1, 5)
-
-        self.del_block = QPushButton("Delete block")
-        self.del_instance = QPushButton("Delete instance")
-        self.del_pin = QPushButton("Delete pin")
-        self.del_net = QPushButton("Delete net")
-        self.del_junction = QPushButton("Delete junction")
-        self.btn_redo = QPushButton("Redo")
-
-        grid_layout.addWidget(self.del_block, 2, 0)
-        grid_layout.addWidget(self.del_instance, 2, 1)
-        grid_layout.addWidget(self.del_pin, 2, 2)
-        grid_layout.addWidget(self.del_net, 2, 3)
-        grid_layout.addWidget(self.del_junction, 2, 4)
-        grid_layout.addWidget(self.btn_redo, 2, 5)
-
-        self.copy_block = QPushButton("Copy block")
-        self.copy_instance = QPushButton("Copy instance")
-
-        grid_layout.addWidget(self.copy_block, 4, 0)
-        grid_layout.addWidget(self.copy_instance, 4, 1)
-
-        self.rename_block = QPushButton("Rename block")
-        self.rename_instance = QPushButton("Rename instance")
-        self.rename_pin = QPushButton("Rename pin")
-        self.rename_net = QPushButton("Rename net")
-
-        grid_layout.addWidget(self.rename_block, 3, 0)
-        grid_layout.addWidget(self.rename_instance, 3, 1)
-        grid_layout.addWidget(self.rename_pin, 3, 2)
-        grid_layout.addWidget(self.rename_net, 3, 3)
+        self.toolbar_buttons = {}
+        for attr, text, row, col in self.TOOLBAR_BUTTONS:
+            button = QPushButton(text)
+            setattr(self, attr, button)
+            self.toolbar_buttons[attr] = button
+            grid_layout.addWidget(button, row, col)
 
         toolbar_layout.addLayout(grid_layout)
         toolbar_layout.addStretch()
@@ -124,9 +110,17 @@ class EditorWindowUI(QMainWindow):
 
         right_layout.addWidget(QLabel("Editor zone"))
 
-        self.graphics_frame = QWidget()
-
-        right_layout.addWidget(self.graphics_frame)
+        self.graphics_view = QGraphicsView()
+        self.graphics_view.setViewportUpdateMode(
+            QGraphicsView.ViewportUpdateMode.FullViewportUpdate)
+        # schematics are axis-aligned lines: skip antialiasing entirely
+        self.graphics_view.setRenderHints(QPainter.RenderHint(0))
+        self.graphics_view.setOptimizationFlags(
+            QGraphicsView.OptimizationFlag.DontSavePainterState
+            | QGraphicsView.OptimizationFlag.DontAdjustForAntialiasing)
+        self.graphics_view.setDragMode(QGraphicsView.DragMode.NoDrag)
+
+        right_layout.addWidget(self.graphics_view)
 
         self.splitter.addWidget(left_widget)
         self.splitter.addWidget(right_widget)
@@ -1,3 +1,5 @@
+from functools import cached_property
+
 from PyQt6 import QtCore, QtWidgets
 
 
@@ -9,7 +11,14 @@ class WelcomeWindowUI(object):
         self.horizontal_layout = QtWidgets.QHBoxLayout()
         self.checker_button = QtWidgets.QPushButton(parent=self.central_widget)
         self.editor_button = QtWidgets.QPushButton(parent=self.central_widget)
-        self.status_bar = QtWidgets.QStatusBar(parent=main_window)
+        self._main_window = main_window
+
+    @cached_property
+    def status_bar(self):
+        """Created on first use, the welcome screen starts without one."""
+        status_bar = QtWidgets.QStatusBar(parent=self._main_window)
+        status_bar.setObjectName("status_bar")
+        return status_bar
 
     def setup_ui(self, main_window):
         main_window.setObjectName("welcome_window")
@@ -34,8 +43,8 @@ class WelcomeWindowUI(object):
         self.editor_button.setIconSize(QtCore.QSize(16, 16))
         self.editor_button.setObjectName("editor_button")
 
-        self.status_bar.setObjectName("status_bar")
-        main_window.setStatusBar(self.status_bar)
+        QtCore.QTimer.singleShot(
+            0, lambda: main_window.setStatusBar(self.status_bar))
 
         self.retranslate_ui(main_window)
         QtCore.QMetaObject.connectSlotsByName(main_window)
@@ -1,10 +1,104 @@
 import os
 import json
+import queue
+import shlex
+import stat
 import subprocess
+import threading
+import time
 import uuid
+import weakref
 import datetime
 import hashlib
-from typing import List, Dict, Optional
+import zlib
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
+
+from PyQt6.QtCore import QCoreApplication, QTimer
+
+
+# пустая сцена в том же компактном виде, что и serialize_scene(compact=True)
+_INITIAL_PROJECT_BYTES = b'{"blocks":[]}'
+
+
+def _full_sha(value: str) -> Optional[str]:
+    """Вернуть value, только если это полный хеш коммита (SHA-1 или SHA-256)"""
+    value = value.strip()
+    if len(value) in (40, 64) and all(c in "0123456789abcdef" for c in value):
+        return value
+    return None
+
+
+def _state_hash(content: bytes) -> bytes:
+    """Короткий отпечаток сериализованной сцены"""
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+
+def _normalize_path(path: str) -> str:
+    """Абсолютный путь без .. и лишних разделителей — ключ маппинга и сравнения путей"""
+    return os.path.normpath(os.path.abspath(path))
+
+
+def _blob_id(content: bytes) -> str:
+    """Хеш, который git присвоит blob с этим содержимым (как git hash-object)"""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+def _file_blob_id(path: str) -> str:
+    """То же, что _blob_id, но файл читается кусками и целиком в память не попадает"""
+    h = hashlib.sha1(b"blob %d\0" % os.path.getsize(path))
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _write_atomic(path: str, data: bytes, durable: bool = False):
+    """Записать файл целиком или не трогать вовсе: временный файл + os.replace.
+       durable — ещё и fsync, только для редких записей (на каждое действие слишком дорого)"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _stop_process(process: subprocess.Popen):
+    """Закрыть stdin долгоживущего git-процесса и дождаться его завершения"""
+    try:
+        process.stdin.close()
+        process.wait(timeout=5)
+    except Exception:
+        process.kill()
+
+
+def _run_tasks(tasks: queue.Queue):
+    """Цикл фонового потока: выполнять задачи VersionManager по очереди до None"""
+    while True:
+        task = tasks.get()
+        try:
+            if task is None:
+                return
+            task()
+        finally:
+            tasks.task_done()
+        # выполненная задача не должна держать VersionManager живым до следующей
+        task = None
+
+
+def _shutdown(tasks: queue.Queue, worker: threading.Thread, app, on_quit):
+    """Финализатор VersionManager: отписаться от aboutToQuit, дождаться коммитов, остановить поток"""
+    if app is not None:
+        try:
+            app.aboutToQuit.disconnect(on_quit)
+        except (TypeError, RuntimeError):
+            pass
+    # из самого фонового потока ждать нельзя; очередь и так выполнится до None
+    if threading.current_thread() is not worker:
+        tasks.join()
+    tasks.put(None)
 
 
 class VersionManager:
@@ -12,11 +106,21 @@ class VersionManager:
     Простая система версионирования через git.
     Создает отдельный репозиторий для каждого файла.
     Сохраняет состояние проекта в git после каждого действия.
-    Undo/Redo работают через git checkout.
+    Undo/Redo читают состояние из коммитов через git cat-file --batch.
     """
 
     HISTORY_BASE_DIR = os.path.join(os.path.curdir, ".editor_history")
     MAPPING_FILE = os.path.join(HISTORY_BASE_DIR, "file_mapping.json")
+    # глубина отката: git log читает не больше MAX_UNDO + 1 коммитов
+    MAX_UNDO = 50
+    # раз в столько коммитов фоновый поток упаковывает репозиторий
+    GC_INTERVAL = 200
+    GIT_USER = "NetlistEditor"
+    GIT_EMAIL = "netlist@editor.local"
+    # (mtime_ns, size, blob) внешнего файла на момент последней синхронизации, внутри .git
+    STAMP_FILE = "editor_state.json"
+    # сохранения чаще этого окна (мс) сливаются в один коммит; 0 — без слияния
+    COALESCE_MS = 250
 
     def __init__(self, file_path: Optional[str], controller):
         """
@@ -27,15 +131,14 @@ class VersionManager:
             controller: Ссылка на controller из graphical.py для сохранения/загрузки
         """
         self.controller = controller
-        self.file_path = file_path
+        self.file_path = _normalize_path(file_path) if file_path else None
         self.repository_id = None
 
         os.makedirs(self.HISTORY_BASE_DIR, exist_ok=True)
         self.mapping = self._load_mapping()
 
-        if file_path:
-            normalized_path = os.path.normpath(os.path.abspath(file_path))
-            self.repository_id = self._get_or_create_repository_id(normalized_path)
+        if self.file_path:
+            self.repository_id = self._get_or_create_repository_id(self.file_path)
         else:
             self.repository_id = str(uuid.uuid4())
             print(f"Created new repository for unsaved file: {self.repository_id}")
@@ -44,27 +147,72 @@ class VersionManager:
         self.filename = "project_state.json"
         self.project_file = os.path.join(self.git_dir, self.filename)
 
+        self._cat = None
+        # git fast-import живёт всю сессию; запускается при первом коммите
+        self._importer = None
+        self._next_mark = 1
+        # разобранный git log; сбрасывается при каждом новом коммите
+        self._history_cache: Optional[List[Dict]] = None
+        self._commit_index: Dict[str, int] = {}
+        # корневой коммит не меняется, пока репозиторий тот же
+        self._initial_commit: Optional[str] = None
+        # отпечаток последнего закоммиченного (или загруженного) состояния
+        self._last_state_hash: Optional[bytes] = None
+        self._commits_since_gc = 0
+        # blob последнего сохранения во внешний файл, ещё не отмеченного в STAMP_FILE
+        self._saved_blob: Optional[str] = None
+        # содержимое последних коммитов (сжатое zlib): undo/redo обычно обходятся без git
+        self._snapshots: "OrderedDict[str, bytes]" = OrderedDict()
+        # коммиты выполняются в фоновом потоке строго по порядку
+        self._tasks: queue.Queue = queue.Queue()
+        worker = threading.Thread(target=_run_tasks, args=(self._tasks,), daemon=True)
+        worker.start()
+        # состояние, ожидающее конца окна слияния: (содержимое, действия)
+        self._pending: Optional[Tuple[bytes, List[str]]] = None
+        # состояния, отданные фоновому потоку: коммитятся пачкой, по коммиту на каждое
+        self._outbox: List[Tuple[bytes, str]] = []
+        self._outbox_lock = threading.Lock()
+        self._save_timer = QTimer()
+        self._save_timer.setSingleShot(True)
+        self._save_timer.timeout.connect(self._queue_pending)
+        app = QCoreApplication.instance()
+        flush = weakref.WeakMethod(self.flush)
+
+        def flush_on_quit():
+            manager_flush = flush()
+            if manager_flush:
+                manager_flush()
+
+        if app is not None:
+            app.aboutToQuit.connect(flush_on_quit)
+        self._finalizer = weakref.finalize(self, _shutdown, self._tasks, worker, app, flush_on_quit)
         self._init_git()
+        self._start_cat_file()
+        # всегда полный хеш (или None), поэтому сравнивается только через ==
         self.current_commit = self._get_current_commit()
 
+        # сверка с внешним файлом и прогрев git идут в фоне, пока редактор
+        # сам загружает файл; undo/redo/история дождутся их через flush()
         if file_path and os.path.exists(file_path):
-            self._sync_external_changes()
+            self._tasks.put(self._sync_external_changes)
+        self._tasks.put(self._warm_up)
 
     def _load_mapping(self) -> Dict:
         """Загрузить маппинг файлов из JSON"""
-        if os.path.exists(self.MAPPING_FILE):
-            try:
-                with open(self.MAPPING_FILE, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"Error loading mapping file: {e}")
+        try:
+            with open(self.MAPPING_FILE, "rb") as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading mapping file: {e}")
         return {}
 
     def _save_mapping(self):
         """Сохранить маппинг файлов в JSON"""
         try:
-            with open(self.MAPPING_FILE, "w", encoding="utf-8") as f:
-                json.dump(self.mapping, f, indent=2)
+            _write_atomic(self.MAPPING_FILE, json.dumps(self.mapping, indent=2).encode("utf-8"),
+                          durable=True)
         except Exception as e:
             print(f"Error saving mapping file: {e}")
 
@@ -73,7 +221,8 @@ class VersionManager:
         if file_path in self.mapping:
             return self.mapping[file_path]
 
-        path_hash = hashlib.md5(file_path.encode()).hexdigest()[:16]
+        # blake2b вместо md5: тот же 16-символьный ID, но md5 недоступен в режиме FIPS
+        path_hash = hashlib.blake2b(file_path.encode("utf-8"), digest_size=8).hexdigest()
         repo_id = f"file_{path_hash}"
 
         self.mapping[file_path] = repo_id
@@ -83,15 +232,15 @@ class VersionManager:
 
     def associate_with_file(self, file_path: str):
         """Связать текущий репозиторий с файлом"""
-        normalized_path = os.path.normpath(os.path.abspath(file_path))
+        normalized_path = _normalize_path(file_path)
+        self.flush()
 
         if normalized_path in self.mapping:
             existing_repo_id = self.mapping[normalized_path]
             if existing_repo_id != self.repository_id:
                 try:
-                    self.controller.save_scene(self.project_file)
-                    subprocess.run(["git", "-C", self.git_dir, "add", "-f", self.filename], check=False)
-                    subprocess.run(["git", "-C", self.git_dir, "commit", "-m", f"Final state before file association"], check=False)
+                    self._commit_now(self.controller.serialize_scene(),
+                                     "Final state before file association")
                 except Exception:
                     pass
 
@@ -99,18 +248,22 @@ class VersionManager:
                 self.repository_id = existing_repo_id
                 self.git_dir = os.path.join(self.HISTORY_BASE_DIR, self.repository_id)
                 self.project_file = os.path.join(self.git_dir, self.filename)
+                self._start_cat_file()
+                self._stop_fast_import()
+                self._history_cache = None
+                self._initial_commit = None
+                self._last_state_hash = None
+                self._snapshots.clear()
                 self.file_path = normalized_path
                 self.current_commit = self._get_current_commit()
                 
                 if os.path.exists(file_path):
                     try:
-                        with open(file_path, "r", encoding="utf-8") as f:
-                            content = f.read()
-                        with open(self.project_file, "w", encoding="utf-8") as f:
-                            f.write(content)
-                        subprocess.run(["git", "-C", self.git_dir, "add", "-f", self.filename], check=False)
-                        subprocess.run(["git", "-C", self.git_dir, "commit", "-m", f"Associated with file: {os.path.basename(file_path)}"], check=False)
-                        self.current_commit = self._get_current_commit()
+                        # сначала сверяем хеш кусками, читаем файл, только если он отличается
+                        if _file_blob_id(file_path) != self._head_blob_id():
+                            with open(file_path, "rb") as f:
+                                content = f.read()
+                            self._commit_now(content, f"Associated with file: {os.path.basename(file_path)}")
                     except Exception as e:
                         print(f"Error copying state to existing repository: {e}")
                 
@@ -118,8 +271,10 @@ class VersionManager:
                 return
         
         self.file_path = normalized_path
-        self.mapping[normalized_path] = self.repository_id
-        self._save_mapping()
+        # уже привязан к этому репозиторию — файл маппинга не переписываем
+        if self.mapping.get(normalized_path) != self.repository_id:
+            self.mapping[normalized_path] = self.repository_id
+            self._save_mapping()
         
         print(f"Associated repository {self.repository_id} with file {normalized_path}")
 
@@ -127,55 +282,200 @@ class VersionManager:
         """Инициализация git репозитория"""
         try:
             if not self._git_repo_exists():
-                subprocess.run(["git", "init", self.git_dir], check=True)
-                subprocess.run(["git", "-C", self.git_dir, "config", "user.name", "NetlistEditor"], check=True)
-                subprocess.run(["git", "-C", self.git_dir, "config", "user.email", "netlist@editor.local"], check=True)
+                os.makedirs(self.git_dir, exist_ok=True)
+                # одна оболочка вместо отдельного процесса на каждую команду
+                commands = ["git init -q",
+                            f"git config user.name {shlex.quote(self.GIT_USER)}",
+                            f"git config user.email {shlex.quote(self.GIT_EMAIL)}"]
 
                 if not os.path.exists(self.project_file):
-                    with open(self.project_file, "w", encoding="utf-8") as f:
-                        json.dump({"blocks": []}, f, indent=2)
-                    subprocess.run(["git", "-C", self.git_dir, "add", "-f", self.filename], check=True)
-                    subprocess.run(["git", "-C", self.git_dir, "commit", "-m", "Initial commit"], check=True)
+                    _write_atomic(self.project_file, _INITIAL_PROJECT_BYTES)
+                    commands += [f"git add -f {shlex.quote(self.filename)}",
+                                 "git commit -q -m 'Initial commit'"]
+                self._sh(" && ".join(commands))
         except Exception as e:
             print(f"Ошибка при инициализации git: {e}")
 
     def _git_repo_exists(self) -> bool:
         """Проверяет, существует ли git репозиторий в специальной поддиректории"""
         try:
-            git_subdir = os.path.join(self.git_dir, ".git")
-            return os.path.exists(git_subdir) and os.path.isdir(git_subdir)
-        except:
+            # один stat вместо exists + isdir
+            return stat.S_ISDIR(os.stat(os.path.join(self.git_dir, ".git")).st_mode)
+        except OSError:
             return False
 
+    def _git(self, *args: str, check: bool = True, text: bool = True,
+             input: Optional[bytes] = None):
+        """Выполнить git-команду в репозитории истории и вернуть её stdout"""
+        if input is not None:
+            text = False
+        result = subprocess.run(["git", "-C", self.git_dir, *args], input=input,
+                                capture_output=True, text=text, check=check)
+        return result.stdout
+
+    def _sh(self, script: str, input: Optional[bytes] = None) -> str:
+        """Выполнить цепочку команд одной оболочкой в папке репозитория"""
+        result = subprocess.run(script, shell=True, executable="/bin/sh",
+                                cwd=self.git_dir, input=input,
+                                capture_output=True, check=True)
+        return result.stdout.decode("utf-8", "replace")
+
+    def _start_cat_file(self):
+        """Запустить (или перезапустить) git cat-file --batch для текущего репозитория"""
+        if self._cat is not None:
+            self._cat_finalizer()
+            self._cat = None
+        try:
+            self._cat = subprocess.Popen(["git", "-C", self.git_dir, "cat-file", "--batch"],
+                                         stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        except OSError as e:
+            print(f"Не удалось запустить git cat-file: {e}")
+            return
+        self._cat_finalizer = weakref.finalize(self, _stop_process, self._cat)
+
+    def _fast_import(self) -> subprocess.Popen:
+        """Долгоживущий git fast-import текущего репозитория (перезапускается, если упал)"""
+        if self._importer is None or self._importer.poll() is not None:
+            self._stop_fast_import()
+            self._importer = subprocess.Popen(["git", "-C", self.git_dir, "fast-import", "--quiet"],
+                                              stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+            self._importer_finalizer = weakref.finalize(self, _stop_process, self._importer)
+            self._next_mark = 1
+        return self._importer
+
+    def _stop_fast_import(self):
+        if self._importer is not None:
+            self._importer_finalizer()
+            self._importer = None
+
+    def _read_blob(self, commit: str) -> bytes:
+        """Прочитать project_state.json из коммита без checkout"""
+        return self._read_object(commit)[1]
+
+    def _read_object(self, commit: str) -> Tuple[str, bytes]:
+        """Хеш blob и содержимое project_state.json в коммите через cat-file --batch"""
+        if self._cat is None or self._cat.poll() is not None:
+            self._start_cat_file()
+        if self._cat is None:
+            raise RuntimeError("git cat-file is not running")
+        self._cat.stdin.write(f"{commit}:{self.filename}\n".encode())
+        self._cat.stdin.flush()
+        # заголовок: "<sha> blob <size>" или "<name> missing"
+        header = self._cat.stdout.readline().split()
+        if len(header) != 3 or header[1] != b"blob":
+            raise RuntimeError(f"{self.filename} not found in commit {commit}")
+        data = self._cat.stdout.read(int(header[2]))
+        self._cat.stdout.read(1)
+        return header[0].decode("ascii"), data
+
+    def _remember_state(self, commit: str, data: bytes):
+        """Запомнить содержимое коммита, вытесняя самые старые"""
+        # JSON сцены сжимается в разы, а уровень 1 почти не стоит времени
+        self._snapshots[commit] = zlib.compress(data, 1)
+        self._snapshots.move_to_end(commit)
+        while len(self._snapshots) > self.MAX_UNDO + 1:
+            self._snapshots.popitem(last=False)
+
+    def _snapshot(self, commit: Optional[str]) -> Optional[bytes]:
+        """Содержимое коммита из памяти или None"""
+        packed = self._snapshots.get(commit) if commit else None
+        if packed is None:
+            return None
+        self._snapshots.move_to_end(commit)
+        return zlib.decompress(packed)
+
+    def _state_at(self, commit: str) -> bytes:
+        """Содержимое project_state.json в коммите: из памяти, иначе через cat-file"""
+        data = self._snapshot(commit)
+        if data is None:
+            data = self._read_blob(commit)
+            self._remember_state(commit, data)
+        return data
+
+    def _read_head(self) -> Optional[str]:
+        """Прочитать хеш коммита HEAD прямо из .git, не запуская git"""
+        git_subdir = os.path.join(self.git_dir, ".git")
+        try:
+            with open(os.path.join(git_subdir, "HEAD"), "r", encoding="utf-8") as f:
+                head = f.read().strip()
+            if not head.startswith("ref: "):
+                return _full_sha(head)
+            ref = head[len("ref: "):]
+            ref_path = os.path.join(git_subdir, *ref.split("/"))
+            if os.path.exists(ref_path):
+                with open(ref_path, "r", encoding="utf-8") as f:
+                    return _full_sha(f.read())
+            packed_refs = os.path.join(git_subdir, "packed-refs")
+            if os.path.exists(packed_refs):
+                with open(packed_refs, "r", encoding="utf-8") as f:
+                    for line in f:
+                        sha, _, name = line.strip().partition(" ")
+                        if name == ref:
+                            return _full_sha(sha)
+        except OSError:
+            pass
+        return None
+
+    def _stamp_path(self) -> str:
+        return os.path.join(self.git_dir, ".git", self.STAMP_FILE)
+
+    def _record_file_stamp(self, blob: str):
+        """Запомнить stat внешнего файла, содержимое которого совпадает с blob в HEAD"""
+        try:
+            st = os.stat(self.file_path)
+            _write_atomic(self._stamp_path(), json.dumps(
+                {"mtime_ns": st.st_mtime_ns, "size": st.st_size,
+                 "blob": blob, "head": self.current_commit}).encode("utf-8"))
+        except (OSError, TypeError) as e:
+            print(f"Не удалось сохранить отметку файла: {e}")
+
+    def _file_unchanged_since_stamp(self) -> bool:
+        """Внешний файл не трогали с последней синхронизации, и HEAD с тех пор не сдвигался"""
+        try:
+            with open(self._stamp_path(), "r", encoding="utf-8") as f:
+                stamp = json.load(f)
+            st = os.stat(self.file_path)
+        except (OSError, ValueError):
+            return False
+        return ((st.st_mtime_ns, st.st_size) == (stamp.get("mtime_ns"), stamp.get("size"))
+                and stamp.get("head") == self._read_head())
+
+    def _head_blob_id(self) -> Optional[str]:
+        """Хеш blob с project_state.json в HEAD (через запущенный cat-file, без нового процесса)"""
+        if not self.current_commit:
+            return None
+        try:
+            blob, data = self._read_object(self.current_commit)
+        except RuntimeError:
+            return None
+        # содержимое всё равно понадобится первому undo
+        self._remember_state(self.current_commit, data)
+        return blob
+
     def _sync_external_changes(self):
         """Синхронизирует изменения файла, если он был изменен вне редактора"""
         if self.file_path and os.path.exists(self.file_path):
             try:
-                with open(self.file_path, "r", encoding="utf-8") as f:
-                    external_content = f.read()
-                
-                if os.path.exists(self.project_file):
-                    with open(self.project_file, "r", encoding="utf-8") as f:
-                        repo_content = f.read()
-                else:
-                    repo_content = None
-
-                if external_content != repo_content:
-                    with open(self.project_file, "w", encoding="utf-8") as f:
-                        f.write(external_content)
-                    
+                # файл не менялся с прошлого раза — не читаем его вовсе
+                if self._file_unchanged_since_stamp():
+                    return
+
+                blob = _file_blob_id(self.file_path)
+
+                if blob != self._head_blob_id():
+                    # целиком файл читается, только если его действительно надо коммитить
+                    with open(self.file_path, "rb") as f:
+                        external_content = f.read()
+                    blob = _blob_id(external_content)
                     print("Обнаружены внешние изменения файла, фиксируем в git...")
-                    subprocess.run(["git", "-C", self.git_dir, "add", "-f", self.filename], check=True)
-                    commit_message = f"External changes - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-                    subprocess.run(["git", "-C", self.git_dir, "commit", "-m", commit_message], check=True)
-                    result = subprocess.run(
-                        ["git", "-C", self.git_dir, "rev-parse", "HEAD"],
-                        capture_output=True,
-                        text=True,
-                        check=True
-                    )
-                    self.current_commit = result.stdout.strip()
+                    commit_message = f"External changes - {time.strftime('%Y-%m-%d %H:%M:%S')}"
+                    head = self.current_commit
+                    # выполняется в фоновом потоке, поэтому без flush()
+                    self._commit_batch([(external_content, commit_message)])
+                    if self.current_commit == head:
+                        return
                     print(f"Внешние изменения зафиксированы: {commit_message}, коммит: {self.current_commit[:7]}")
+                self._record_file_stamp(blob)
             except Exception as e:
                 print(f"Ошибка при синхронизации внешних изменений: {e}")
 
@@ -188,36 +488,167 @@ class VersionManager:
             save_to_file: Если указан, сохранить также во внешний файл (для saved файлов)
         """
         try:
+            # сцену снимаем сразу, а рабочую копию пишет и коммитит фоновый поток;
+            # внешний файл остаётся читаемым и совпадает с копией в репозитории
+            content = self.controller.serialize_scene(compact=not save_to_file)
             if save_to_file:
-                self.controller.save_scene(save_to_file)
-                with open(save_to_file, "r", encoding="utf-8") as f:
-                    content = f.read()
-                with open(self.project_file, "w", encoding="utf-8") as f:
-                    f.write(content)
+                _write_atomic(save_to_file, content)
+                if self.file_path and _normalize_path(save_to_file) == self.file_path:
+                    # отметку запишет фоновый поток, когда это содержимое попадёт в HEAD
+                    self._saved_blob = _blob_id(content)
+
+            state_hash = _state_hash(content)
+            if state_hash == self._last_state_hash:
+                print(f"Состояние не изменилось, коммит пропущен: {action_name}")
+                return
+            self._last_state_hash = state_hash
+
+            action = f"{action_name} - {time.strftime('%Y-%m-%d %H:%M:%S')}"
+            actions = self._pending[1] if self._pending else []
+            self._pending = (content, actions + [action])
+            if self.COALESCE_MS > 0:
+                self._save_timer.start(self.COALESCE_MS)
             else:
-                self.controller.save_scene(self.project_file)
-
-            subprocess.run(["git", "-C", self.git_dir, "add", "-f", self.filename], check=True)
-            commit_message = f"{action_name} - {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-            result = subprocess.run(
-                ["git", "-C", self.git_dir, "commit", "-m", commit_message],
-                capture_output=True,
-                text=True
-            )
-
-            result = subprocess.run(
-                ["git", "-C", self.git_dir, "rev-parse", "HEAD"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            self.current_commit = result.stdout.strip()
-
-            print(f"Состояние сохранено: {commit_message}, коммит: {self.current_commit[:7]}")
+                self._queue_pending()
+
+        except Exception as e:
+            print(f"Ошибка при сохранении состояния: {e}")
+
+    def __del__(self):
+        # окно слияния ещё не закрылось: состояние отдаём фоновому потоку, пока объект жив;
+        # таймер не трогаем — он мог остаться в другом потоке; дальше работает _finalizer
+        try:
+            self._hand_over_pending()
+        except Exception:
+            pass
+
+    def _queue_pending(self):
+        """Отдать накопленное состояние фоновому потоку одним коммитом"""
+        self._save_timer.stop()
+        self._hand_over_pending()
+
+    def _hand_over_pending(self):
+        if self._pending is None:
+            return
+        content, actions = self._pending
+        self._pending = None
+        with self._outbox_lock:
+            self._outbox.append((content, "; ".join(actions)))
+        self._tasks.put(self._commit_outbox)
+
+    def _commit_now(self, content: bytes, commit_message: str):
+        """Закоммитить состояние сразу, в текущем потоке, после уже отданных фоновому"""
+        self.flush()
+        self._commit_batch([(content, commit_message)])
+
+    def _warm_up(self):
+        """Запустить git fast-import и загрузить HEAD через cat-file (в фоновом потоке)"""
+        try:
+            self._fast_import()
+            if self.current_commit:
+                self._state_at(self.current_commit)
+        except Exception as e:
+            print(f"Ошибка при подготовке git: {e}")
+
+    def flush(self):
+        """Закоммитить отложенное состояние и дождаться фонового потока"""
+        self._queue_pending()
+        self._tasks.join()
+
+    def _head_ref(self) -> str:
+        """Ветка, на которую указывает HEAD"""
+        try:
+            with open(os.path.join(self.git_dir, ".git", "HEAD"), "r", encoding="utf-8") as f:
+                head = f.read().strip()
+            if head.startswith("ref: "):
+                return head[len("ref: "):]
+        except OSError:
+            pass
+        return "refs/heads/master"
+
+    def _commit_outbox(self):
+        """Закоммитить все накопленные состояния через git fast-import (в фоновом потоке)"""
+        with self._outbox_lock:
+            batch, self._outbox = self._outbox, []
+        if batch:
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch: List[Tuple[bytes, str]]):
+        """Закоммитить состояния по порядку, по коммиту на каждое"""
+        try:
+            importer = self._fast_import()
+            parent = self._read_head()
+            previous = self._snapshot(parent)
+            now = datetime.datetime.now().astimezone()
+            committer = (f"{self.GIT_USER} <{self.GIT_EMAIL}> {int(now.timestamp())} "
+                         f"{now.strftime('%z')}").encode("utf-8")
+            filename = self.filename.encode("utf-8")
+
+            # по коммиту на каждое состояние; одинаковые подряд (как и раньше) не коммитятся
+            stream = []
+            commits = []
+            for content, commit_message in batch:
+                if content == previous:
+                    continue
+                previous = content
+                blob_mark = self._next_mark
+                self._next_mark += 2
+                message = commit_message.encode("utf-8")
+                stream.append(b"blob\nmark :%d\ndata %d\n%s\n" % (blob_mark, len(content), content))
+                stream.append(b"commit %s\nmark :%d\ncommitter %s\ndata %d\n%s\n"
+                              % (self._head_ref().encode("utf-8"), blob_mark + 1,
+                                 committer, len(message), message))
+                if not commits and parent:
+                    stream.append(b"from %s\n" % parent.encode("ascii"))
+                stream.append(b"M 100644 :%d %s\n\n" % (blob_mark, filename))
+                commits.append((blob_mark + 1, content, commit_message))
+            if not commits:
+                self.current_commit = parent
+                self._stamp_saved_file(batch[-1][0])
+                return
+            # checkpoint записывает пакет и двигает ветку; get-mark отвечает уже после него
+            stream.append(b"checkpoint\n\n")
+            stream.extend(b"get-mark :%d\n" % mark for mark, _, _ in commits)
+
+            # содержимое уходит в git прямо из памяти, без нового процесса;
+            # рабочая копия и индекс не используются
+            importer.stdin.write(b"".join(stream))
+            importer.stdin.flush()
+            output = [importer.stdout.readline().decode("ascii").strip() for _ in commits]
+            if not all(map(_full_sha, output)):
+                self._stop_fast_import()
+                raise RuntimeError("git fast-import stopped")
+
+            # историю дополняем в памяти — git log после коммита не нужен
+            date = now.isoformat(timespec="seconds")
+            created = []
+            for sha, (_, content, commit_message) in zip(output, commits):
+                self.current_commit = sha
+                self._remember_state(sha, content)
+                created.insert(0, {"hash": sha, "message": commit_message, "date": date})
+                print(f"Состояние сохранено: {commit_message}, коммит: {sha[:7]}")
+            if self._history_cache is not None:
+                self._set_history(created + self._history_cache)
+            self._stamp_saved_file(commits[-1][1])
+
+            self._commits_since_gc += len(commits)
+            if self._commits_since_gc >= self.GC_INTERVAL:
+                self._commits_since_gc = 0
+                self._git("gc", "--auto", "--quiet", check=False)
 
         except Exception as e:
+            self._history_cache = None
+            # save_state запомнил отпечаток ещё при постановке в очередь; состояние
+            # до git не дошло, поэтому такое же следующее сохранение пропускать нельзя
+            self._last_state_hash = None
             print(f"Ошибка при сохранении состояния: {e}")
 
+    def _stamp_saved_file(self, head_content: bytes):
+        """Отметить внешний файл, если в HEAD попало то, что в него сохранено"""
+        if self._saved_blob is not None and _blob_id(head_content) == self._saved_blob:
+            self._record_file_stamp(self._saved_blob)
+            self._saved_blob = None
+
     def undo(self) -> bool:
         """
         Откатить последнее изменение
@@ -226,30 +657,29 @@ class VersionManager:
             True если откат успешен, False в противном случае
         """
         try:
+            self.flush()
             commits = self._get_commit_history()
             if len(commits) < 2:
                 print("Нет изменений для отката")
                 return False
 
-            current_index = -1
-            for i, commit in enumerate(commits):
-                if commit['hash'].startswith(self.current_commit):
-                    current_index = i
-                    break
-
-            if current_index == -1:
-                current_index = 0
+            current_index = self.current_index
 
             initial_commit = self._get_initial_commit()
             if self.current_commit == initial_commit:
                 print("Невозможно откатить, достигнуто начальное состояние")
                 return False
 
+            if current_index + 1 >= len(commits):
+                print(f"Невозможно откатить больше чем на {self.MAX_UNDO} действий")
+                return False
+
             prev_commit = commits[current_index + 1]['hash']
 
-            subprocess.run(["git", "-C", self.git_dir, "checkout", prev_commit, "--", self.filename], check=True)
+            data = self._state_at(prev_commit)
+            self._last_state_hash = _state_hash(data)
 
-            self.controller.load_scene(self.project_file)
+            self.controller.load_scene_from_bytes(data)
 
             self.current_commit = prev_commit
 
@@ -258,7 +688,6 @@ class VersionManager:
 
         except Exception as e:
             print(f"Ошибка при откате: {e}")
-            subprocess.run(["git", "-C", self.git_dir, "checkout", self.current_commit, "--", self.filename], check=False)
             return False
 
     def redo(self) -> bool:
@@ -269,19 +698,13 @@ class VersionManager:
             True если возврат успешен, False в противном случае
         """
         try:
+            self.flush()
             commits = self._get_commit_history()
             if len(commits) < 2:
                 print("Нет изменений для возврата")
                 return False
 
-            current_index = -1
-            for i, commit in enumerate(commits):
-                if commit['hash'].startswith(self.current_commit):
-                    current_index = i
-                    break
-
-            if current_index == -1:
-                current_index = 0
+            current_index = self.current_index
 
             if current_index <= 0:
                 print("Невозможно вернуть изменения, достигнут конец истории")
@@ -289,9 +712,10 @@ class VersionManager:
 
             next_commit = commits[current_index - 1]['hash']
 
-            subprocess.run(["git", "-C", self.git_dir, "checkout", next_commit, "--", self.filename], check=True)
+            data = self._state_at(next_commit)
+            self._last_state_hash = _state_hash(data)
 
-            self.controller.load_scene(self.project_file)
+            self.controller.load_scene_from_bytes(data)
 
             self.current_commit = next_commit
 
@@ -300,7 +724,6 @@ class VersionManager:
 
         except Exception as e:
             print(f"Ошибка при возврате изменений: {e}")
-            subprocess.run(["git", "-C", self.git_dir, "checkout", self.current_commit, "--", self.filename], check=False)
             return False
 
     def _get_commit_history(self) -> List[Dict]:
@@ -310,79 +733,68 @@ class VersionManager:
         Returns:
             Список словарей с информацией о коммитах
         """
+        self.flush()
+        if self._history_cache is not None:
+            return self._history_cache
         try:
-            result = subprocess.run(
-                ["git", "-C", self.git_dir, "log", "--pretty=format:%H|%s|%cd", "--date=iso", "--", self.filename],
-                capture_output=True,
-                text=True,
-                check=True
-            )
+            # записи разделены NUL, поля — \x1f; сообщение последним, в нём может быть что угодно
+            output = self._git("log", "-z", "-n", str(self.MAX_UNDO + 1),
+                               "--pretty=format:%H%x1f%cI%x1f%s",
+                               "--", self.filename, text=False)
 
             commits = []
-            for line in result.stdout.strip().split("\n"):
-                if not line:
-                    continue
-
-                parts = line.split("|", 2)
+            for record in output.split(b"\x00"):
+                parts = record.split(b"\x1f", 2)
                 if len(parts) < 3:
                     continue
 
-                commit_hash, message, date = parts
+                commit_hash, date, message = parts
                 commits.append({
-                    "hash": commit_hash,
-                    "message": message,
-                    "date": date
+                    "hash": commit_hash.decode("ascii"),
+                    "message": message.decode("utf-8", "replace"),
+                    "date": date.decode("ascii")
                 })
 
-            return commits
+            self._set_history(commits)
+            return self._history_cache
         except Exception as e:
             print(f"Ошибка при получении истории коммитов: {e}")
             return []
 
-    def _get_current_commit(self) -> str:
+    def _set_history(self, commits: List[Dict]):
+        """Запомнить историю (не длиннее окна отката) и индекс хеш -> позиция"""
+        commits = commits[:self.MAX_UNDO + 1]
+        self._history_cache = commits
+        self._commit_index = {c["hash"]: i for i, c in enumerate(commits)}
+
+    @property
+    def current_index(self) -> int:
+        """Позиция текущего коммита в истории (0 — самый новый)"""
+        return self._commit_index.get(self.current_commit, 0)
+
+    def _get_current_commit(self) -> Optional[str]:
         """
         Получить текущий коммит HEAD
 
         Returns:
-            Хеш текущего коммита
+            Полный хеш текущего коммита или None
         """
-        try:
-            result = subprocess.run(
-                ["git", "-C", self.git_dir, "rev-parse", "HEAD"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            return result.stdout.strip()
-        except:
-            try:
-                result = subprocess.run(
-                    ["git", "-C", self.git_dir, "rev-list", "--max-parents=0", "HEAD"],
-                    capture_output=True,
-                    text=True,
-                    check=True
-                )
-                return result.stdout.strip().split('\n')[0]
-            except:
-                return None
-
-    def _get_initial_commit(self) -> str:
+        return self._read_head()
+
+    def _get_initial_commit(self) -> Optional[str]:
         """
         Получить первый коммит в репозитории
 
         Returns:
-            Хеш первого коммита
+            Полный хеш первого коммита или None
         """
+        if self._initial_commit is not None:
+            return self._initial_commit
         try:
-            result = subprocess.run(
-                ["git", "-C", self.git_dir, "rev-list", "--max-parents=0", "HEAD"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            return result.stdout.strip().split('\n')[0]
+            self._initial_commit = _full_sha(self._git("rev-list", "--max-parents=0", "HEAD").split('\n')[0])
         except:
             return None
+        return self._initial_commit
 
     def get_history(self) -> List[Dict]:
         """
@@ -418,24 +830,36 @@ if __name__ == "__main__":
 
 
     class MockController:
+        COMPACT_JSON = json.JSONEncoder(separators=(",", ":"), check_circular=False)
+        PRETTY_JSON = json.JSONEncoder(indent=2, check_circular=False)
+
         def __init__(self):
             self.data = {"blocks": []}
 
         def add_block(self, name):
             self.data["blocks"].append({"name": name, "instances": []})
 
+        def serialize_scene(self, compact=False):
+            encoder = self.COMPACT_JSON if compact else self.PRETTY_JSON
+            return encoder.encode(self.data).encode("utf-8")
+
         def save_scene(self, filename):
-            with open(filename, "w", encoding="utf-8") as f:
-                json.dump(self.data, f, indent=2)
+            _write_atomic(filename, self.serialize_scene())
             print(f"Сохранено в {filename}")
 
         def load_scene(self, filename):
-            with open(filename, "r", encoding="utf-8") as f:
-                self.data = json.load(f)
+            with open(filename, "rb") as f:
+                self.load_scene_from_bytes(f.read())
             print(f"Загружено из {filename}")
+
+        def load_scene_from_bytes(self, data):
+            self.data = json.loads(data)
             print(f"Текущее состояние: {self.data}")
 
 
+    # демонстрация идёт без цикла событий: каждое действие коммитим сразу
+    VersionManager.COALESCE_MS = 0
+
     controller = MockController()
     version_manager = VersionManager(temp_dir, controller)
 